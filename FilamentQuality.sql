@@ -41,12 +41,35 @@ CREATE TABLE filamentquality.parts (
     FOREIGN KEY (material_id) REFERENCES filamentquality.materials(material_id)
 );
 
+-- Create characteristic dictionary so sample tables store a 2-byte ID instead of the name on every row
+CREATE TABLE filamentquality.characteristics (
+    characteristic_id SMALLSERIAL PRIMARY KEY,
+    characteristic_name VARCHAR(100) NOT NULL UNIQUE
+);
+
+-- Create ingest manifest table with one row per loaded file
+-- Rows in the data tables point back to the file they came from through source_file_id,
+-- which defaults to the value ingest_file sets for the current transaction
+CREATE TABLE filamentquality.ingest_manifest (
+    source_file_id SERIAL PRIMARY KEY,
+    file_path TEXT NOT NULL UNIQUE,
+    purpose VARCHAR(50) NOT NULL,
+    file_size BIGINT NOT NULL,
+    file_mtime_ns BIGINT NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    rows_rejected BIGINT NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
 -- Create BenchTop Filament Diameter table
 CREATE TABLE filamentquality.BenchTop_Filament_Diameter (
     part_id VARCHAR(50) NOT NULL,
     position REAL NOT NULL,
-    characteristic_name VARCHAR(100) NOT NULL,
+    characteristic_id SMALLINT NOT NULL REFERENCES filamentquality.characteristics(characteristic_id),
     characteristic_value REAL NOT NULL,
+    source_file_id INTEGER DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
     FOREIGN KEY (part_id) REFERENCES filamentquality.parts(part_id)
 );
 
@@ -54,8 +77,10 @@ CREATE TABLE filamentquality.BenchTop_Filament_Diameter (
 CREATE TABLE filamentquality.Live_Print_Data (
     part_id VARCHAR(50) NOT NULL,
     time_stamp REAL NOT NULL,
-    characteristic_name VARCHAR(100) NOT NULL,
+    characteristic_id SMALLINT NOT NULL REFERENCES filamentquality.characteristics(characteristic_id),
     characteristic_value REAL NOT NULL,
+    source_file_id INTEGER DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
     FOREIGN KEY (part_id) REFERENCES filamentquality.parts(part_id)
 );
 
@@ -63,8 +88,48 @@ CREATE TABLE filamentquality.Live_Print_Data (
 CREATE TABLE filamentquality.part_characteristics (
     part_id VARCHAR(50) NOT NULL,
     time_elapsed REAL NOT NULL,
-    characteristic_name VARCHAR(100) NOT NULL,
+    characteristic_id SMALLINT NOT NULL REFERENCES filamentquality.characteristics(characteristic_id),
     characteristic_value REAL NOT NULL,
+    source_file_id INTEGER DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
+    FOREIGN KEY (part_id) REFERENCES filamentquality.parts(part_id)
+);
+
+-- Create compressed archive tier for pressure and diameter series
+-- Each row holds up to 32768 consecutive samples of one part and characteristic as byte-shuffled, zlib-compressed
+-- float32 columns (see series_archive.py); axis_min and axis_max let range reads skip chunks without decompressing them
+CREATE TABLE filamentquality.sample_series_chunks (
+    part_id VARCHAR(50) NOT NULL,
+    source_table VARCHAR(50) NOT NULL,
+    characteristic_id SMALLINT NOT NULL REFERENCES filamentquality.characteristics(characteristic_id),
+    axis_min REAL NOT NULL,
+    axis_max REAL NOT NULL,
+    sample_count INTEGER NOT NULL,
+    axis_data BYTEA NOT NULL,
+    value_data BYTEA NOT NULL,
+    source_file_id INTEGER DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
+    FOREIGN KEY (part_id) REFERENCES filamentquality.parts(part_id)
+);
+-- The chunks are already compressed, so TOAST should store them out of line without trying pglz again
+ALTER TABLE filamentquality.sample_series_chunks ALTER COLUMN axis_data SET STORAGE EXTERNAL;
+ALTER TABLE filamentquality.sample_series_chunks ALTER COLUMN value_data SET STORAGE EXTERNAL;
+
+-- Create summary statistics table with one row per source file, part, sample table and characteristic
+-- Loaders merge count, min, max, mean and m2 (the sum of squared deviations from the mean) into it as they stream
+-- samples (see summary_stats.py); a replaced file's rows cascade away with its manifest entry like its samples
+CREATE TABLE filamentquality.sample_summary_stats (
+    part_id VARCHAR(50) NOT NULL,
+    source_table VARCHAR(50) NOT NULL,
+    characteristic_id SMALLINT NOT NULL REFERENCES filamentquality.characteristics(characteristic_id),
+    sample_count BIGINT NOT NULL,
+    min_value DOUBLE PRECISION NOT NULL,
+    max_value DOUBLE PRECISION NOT NULL,
+    mean_value DOUBLE PRECISION NOT NULL,
+    m2 DOUBLE PRECISION NOT NULL,
+    source_file_id INTEGER NOT NULL DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
+    PRIMARY KEY (part_id, source_table, characteristic_id, source_file_id),
     FOREIGN KEY (part_id) REFERENCES filamentquality.parts(part_id)
 );
 
@@ -76,5 +141,85 @@ CREATE TABLE filamentquality.material_thermal_characteristics (
     time_min REAL NOT NULL,
     temperature REAL NOT NULL,
     heat_flow REAL NOT NULL,
+    source_file_id INTEGER DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
     FOREIGN KEY (material_id) REFERENCES filamentquality.materials(material_id)
 );
+
+-- Create DSC ramp features table with one row per loaded DSC ramp sheet
+-- load_thermal_data fills it from each ramp as it is written (see dsc_features.py), so comparing transitions
+-- across materials reads these rows instead of the raw curves; temperatures in °C, enthalpy in J/g
+CREATE TABLE filamentquality.dsc_ramp_features (
+    id SERIAL PRIMARY KEY,
+    material_id VARCHAR(50) NOT NULL,
+    dsc_ramp TEXT NOT NULL,
+    ramp_direction VARCHAR(10) NOT NULL,
+    heating_rate REAL NOT NULL,
+    temperature_min REAL NOT NULL,
+    temperature_max REAL NOT NULL,
+    sample_count INTEGER NOT NULL,
+    glass_transition_temperature REAL,
+    peak_type VARCHAR(12),
+    onset_temperature REAL,
+    peak_temperature REAL,
+    peak_heat_flow REAL,
+    enthalpy REAL,
+    source_file_id INTEGER DEFAULT NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER
+        REFERENCES filamentquality.ingest_manifest(source_file_id) ON DELETE CASCADE,
+    FOREIGN KEY (material_id) REFERENCES filamentquality.materials(material_id)
+);
+
+-- BRIN indexes on source_file_id keep cascading deletes of replaced files cheap;
+-- ids grow with load order, so the index stays a few pages per table
+CREATE INDEX benchtop_filament_diameter_source_file_idx ON filamentquality.BenchTop_Filament_Diameter USING BRIN (source_file_id);
+CREATE INDEX live_print_data_source_file_idx ON filamentquality.Live_Print_Data USING BRIN (source_file_id);
+CREATE INDEX part_characteristics_source_file_idx ON filamentquality.part_characteristics USING BRIN (source_file_id);
+CREATE INDEX sample_series_chunks_source_file_idx ON filamentquality.sample_series_chunks USING BRIN (source_file_id);
+CREATE INDEX sample_summary_stats_source_file_idx ON filamentquality.sample_summary_stats (source_file_id);
+CREATE INDEX material_thermal_characteristics_source_file_idx ON filamentquality.material_thermal_characteristics USING BRIN (source_file_id);
+CREATE INDEX dsc_ramp_features_source_file_idx ON filamentquality.dsc_ramp_features (source_file_id);
+
+-- Composite indexes turn per-part, per-characteristic series reads into index range scans
+CREATE INDEX benchtop_filament_diameter_series_idx ON filamentquality.BenchTop_Filament_Diameter (part_id, characteristic_id, position);
+CREATE INDEX live_print_data_series_idx ON filamentquality.Live_Print_Data (part_id, characteristic_id, time_stamp);
+CREATE INDEX part_characteristics_series_idx ON filamentquality.part_characteristics (part_id, characteristic_id, time_elapsed);
+CREATE INDEX sample_series_chunks_series_idx ON filamentquality.sample_series_chunks (part_id, source_table, characteristic_id, axis_min);
+CREATE INDEX material_thermal_characteristics_ramp_idx ON filamentquality.material_thermal_characteristics (material_id, dsc_ramp);
+CREATE INDEX dsc_ramp_features_material_idx ON filamentquality.dsc_ramp_features (material_id, dsc_ramp);
+
+-- Part and material quality overviews: the per-file statistics merged with the parallel variance formula,
+-- so reading them costs one row per loaded file instead of a scan of the samples
+CREATE VIEW filamentquality.part_summary_stats AS
+SELECT per_file.part_id, per_file.source_table, per_file.characteristic_id, c.characteristic_name,
+       SUM(per_file.sample_count) AS sample_count,
+       MIN(per_file.min_value) AS min_value,
+       MAX(per_file.max_value) AS max_value,
+       MIN(per_file.overall_mean) AS mean_value,
+       sqrt(SUM(per_file.m2 + per_file.sample_count * (per_file.mean_value - per_file.overall_mean) ^ 2)
+            / NULLIF(SUM(per_file.sample_count) - 1, 0)) AS stddev_value
+FROM (
+    SELECT s.*, SUM(s.sample_count * s.mean_value) OVER w / SUM(s.sample_count) OVER w AS overall_mean
+    FROM filamentquality.sample_summary_stats s
+    WINDOW w AS (PARTITION BY s.part_id, s.source_table, s.characteristic_id)
+) per_file
+JOIN filamentquality.characteristics c ON c.characteristic_id = per_file.characteristic_id
+GROUP BY per_file.part_id, per_file.source_table, per_file.characteristic_id, c.characteristic_name;
+
+CREATE VIEW filamentquality.material_summary_stats AS
+SELECT per_file.material_id, per_file.source_table, per_file.characteristic_id, c.characteristic_name,
+       COUNT(DISTINCT per_file.part_id) AS part_count,
+       SUM(per_file.sample_count) AS sample_count,
+       MIN(per_file.min_value) AS min_value,
+       MAX(per_file.max_value) AS max_value,
+       MIN(per_file.overall_mean) AS mean_value,
+       sqrt(SUM(per_file.m2 + per_file.sample_count * (per_file.mean_value - per_file.overall_mean) ^ 2)
+            / NULLIF(SUM(per_file.sample_count) - 1, 0)) AS stddev_value
+FROM (
+    SELECT s.*, p.material_id,
+           SUM(s.sample_count * s.mean_value) OVER w / SUM(s.sample_count) OVER w AS overall_mean
+    FROM filamentquality.sample_summary_stats s
+    JOIN filamentquality.parts p ON p.part_id = s.part_id
+    WINDOW w AS (PARTITION BY p.material_id, s.source_table, s.characteristic_id)
+) per_file
+JOIN filamentquality.characteristics c ON c.characteristic_id = per_file.characteristic_id
+GROUP BY per_file.material_id, per_file.source_table, per_file.characteristic_id, c.characteristic_name;
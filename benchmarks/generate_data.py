@@ -0,0 +1,166 @@
+import os
+import struct
+import argparse
+import numpy as np
+
+# Column names of the synthetic diameter CSVs; the position column always comes last
+DIAMETER_COLUMNS = ('Diameter X', 'Diameter Y', 'Ovality', 'Diameter Avg', 'Diameter Min', 'Diameter Max')
+# Sample interval of the synthetic pressure logs, in seconds
+PRESSURE_SAMPLE_INTERVAL = 0.001
+
+
+def _glitch(values, rng, reject_rate):
+    """Replaces a fraction of the values with NaN, sensor spikes and text, as seen in real logs."""
+    values = values.astype(object)
+    if reject_rate > 0:
+        count = int(len(values) * reject_rate)
+        indexes = rng.choice(len(values), size=count, replace=False)
+        for i, index in enumerate(indexes):
+            values[index] = ('NaN', '1e39', 'ERR')[i % 3]
+    return values
+
+
+def write_pressure_file(path, rows, seed=0, reject_rate=0.0):
+    """
+    Writes a LabVIEW text log like the ones load_pressure reads: a file header and a channel header,
+    each closed by ***End_of_Header***, a column name line, then tab-separated samples.
+    """
+    rng = np.random.default_rng(seed)
+    time_elapsed = np.arange(rows) * PRESSURE_SAMPLE_INTERVAL
+    temperature = 210.0 + rng.normal(0.0, 0.5, rows)
+    pressure = 35.0 + 5.0 * np.sin(time_elapsed / 3.0) + rng.normal(0.0, 0.2, rows)
+    flow = 1.2 + rng.normal(0.0, 0.01, rows)
+    pressure = _glitch(pressure, rng, reject_rate)
+
+    with open(path, 'w', newline='') as file:
+        file.write("LabVIEW Measurement\t\nWriter_Version\t2\nReader_Version\t2\nSeparator\tTab\n"
+                   "Decimal_Separator\t.\nMulti_Headings\tNo\nX_Columns\tOne\n***End_of_Header***\t\n\n")
+        file.write("Channels\t3\t\t\nSamples\t%d\t%d\t%d\n" % (rows, rows, rows))
+        file.write("Delta_X\t%g\t%g\t%g\n***End_of_Header***\t\t\t\n" % ((PRESSURE_SAMPLE_INTERVAL,) * 3))
+        file.write("X_Value\tTemp (C)\tPressure\tFlow SLPM (Filtered)\n")
+        for i in range(rows):
+            file.write(f"{time_elapsed[i]:.6f}\t{temperature[i]:.4f}\t{pressure[i]}\t{flow[i]:.5f}\n")
+    return rows
+
+
+def _tdms_string(text):
+    data = text.encode('utf-8')
+    return struct.pack('<I', len(data)) + data
+
+def write_tdms_pressure_file(path, rows, segments=4, seed=0):
+    """
+    Writes the same channels as write_pressure_file as a binary TDMS file: float64 waveform channels with a
+    wf_increment property, split over segments. Only the first segment carries metadata; later ones reuse its
+    raw data index, as NI acquisition software writes them.
+    """
+    rng = np.random.default_rng(seed)
+    time_elapsed = np.arange(rows) * PRESSURE_SAMPLE_INTERVAL
+    channels = {
+        "Temp (C)": 210.0 + rng.normal(0.0, 0.5, rows),
+        "Pressure": 35.0 + 5.0 * np.sin(time_elapsed / 3.0) + rng.normal(0.0, 0.2, rows),
+        "Flow SLPM (Filtered)": 1.2 + rng.normal(0.0, 0.01, rows),
+    }
+    bounds = np.linspace(0, rows, segments + 1).astype(int)
+    per_segment = bounds[1] - bounds[0]
+
+    with open(path, 'wb') as file:
+        for segment, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if segment == 0 or end - start != per_segment:
+                metadata = struct.pack('<I', 2 + len(channels))
+                metadata += _tdms_string("/") + struct.pack('<II', 0xFFFFFFFF, 0)
+                metadata += _tdms_string("/'Data'") + struct.pack('<II', 0xFFFFFFFF, 0)
+                for name in channels:
+                    metadata += _tdms_string(f"/'Data'/'{name}'") + struct.pack('<IIIQ', 20, 0x0A, 1, end - start)
+                    metadata += struct.pack('<I', 1) + _tdms_string("wf_increment") + struct.pack('<Id', 0x0A, PRESSURE_SAMPLE_INTERVAL)
+                toc = (1 << 1) | (1 << 2) | (1 << 3)
+            else:
+                metadata = b''
+                toc = 1 << 3
+            raw = b''.join(values[start:end].astype('<f8').tobytes() for values in channels.values())
+            file.write(b'TDSm' + struct.pack('<IIQQ', toc, 4713, len(metadata) + len(raw), len(metadata)))
+            file.write(metadata)
+            file.write(raw)
+    return rows * len(channels)
+
+
+def write_diameter_csv(path, rows, columns=len(DIAMETER_COLUMNS), seed=0, reject_rate=0.0):
+    """
+    Writes a wide benchtop diameter CSV: one column per characteristic followed by the position in metres.
+    Returns the number of samples the file holds once melted to long rows.
+    """
+    rng = np.random.default_rng(seed)
+    names = [DIAMETER_COLUMNS[i] if i < len(DIAMETER_COLUMNS) else f"Channel {i + 1}" for i in range(columns)]
+    position = np.arange(rows) * 0.001
+    values = 1.75 + rng.normal(0.0, 0.02, (rows, columns))
+
+    with open(path, 'w', newline='') as file:
+        file.write(','.join(names + ['Distance (m)']) + '\n')
+        glitched = _glitch(values[:, 0], rng, reject_rate)
+        for i in range(rows):
+            cells = [str(glitched[i])] + [f"{value:.5f}" for value in values[i, 1:]]
+            file.write(','.join(cells) + f",{position[i]:.4f}\n")
+    return rows * columns
+
+
+def write_dsc_workbook(path, sheets, rows_per_sheet, seed=0):
+    """
+    Writes a DSC workbook: a summary sheet, then one ramp sheet per heating or cooling cycle with the ramp name,
+    the column names and the units in the first three rows. Returns the number of data rows.
+    """
+    import openpyxl
+    rng = np.random.default_rng(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    summary = workbook.create_sheet("Summary")
+    summary.append(["Synthetic DSC run", rows_per_sheet, sheets])
+
+    for sheet_index in range(sheets):
+        heating = sheet_index % 2 == 0
+        sheet = workbook.create_sheet(f"Ramp {sheet_index + 1}")
+        sheet.append([f"{'Heat' if heating else 'Cool'} {sheet_index // 2 + 1} 10.00 °C/min"])
+        sheet.append(["Time", "Temperature", "Heat Flow"])
+        sheet.append(["min", "°C", "W/g"])
+        time_min = np.arange(rows_per_sheet) * (20.0 / rows_per_sheet)
+        temperature = 25.0 + 10.0 * time_min if heating else 225.0 - 10.0 * time_min
+        heat_flow = -0.2 + np.exp(-((temperature - 160.0) / 4.0) ** 2) + rng.normal(0.0, 0.002, rows_per_sheet)
+        for row in zip(time_min.tolist(), temperature.tolist(), heat_flow.tolist()):
+            sheet.append(row)
+    workbook.save(path)
+    return sheets * rows_per_sheet
+
+
+def generate(directory, pressure_rows, diameter_rows, dsc_sheets, dsc_rows, seed=0, reject_rate=0.0, tag='bench'):
+    """
+    Writes one file of each kind into directory, named so extract_ids_from_filename yields material and part IDs
+    unique to tag and kind. Returns {kind: (path, expected rows)}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    path = os.path.join(directory, f"pla_benchvendor_pressure_{tag}-pressure.tdms")
+    files['pressure'] = (path, write_pressure_file(path, pressure_rows, seed, reject_rate))
+    path = os.path.join(directory, f"pla_benchvendor_pressure_{tag}-tdms.tdms")
+    files['pressure_tdms'] = (path, write_tdms_pressure_file(path, pressure_rows, seed=seed))
+    path = os.path.join(directory, f"pla_benchvendor_diameter_{tag}-diameter.csv")
+    files['diameter'] = (path, write_diameter_csv(path, diameter_rows, seed=seed, reject_rate=reject_rate))
+    path = os.path.join(directory, f"pla_benchvendor_DSC_{tag}-dsc.xlsx")
+    files['dsc'] = (path, write_dsc_workbook(path, dsc_sheets, dsc_rows, seed))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic pressure, diameter and DSC input files.")
+    parser.add_argument('directory')
+    parser.add_argument('--pressure-rows', type=int, default=100000)
+    parser.add_argument('--diameter-rows', type=int, default=50000)
+    parser.add_argument('--dsc-sheets', type=int, default=4)
+    parser.add_argument('--dsc-rows', type=int, default=20000)
+    parser.add_argument('--reject-rate', type=float, default=0.0, help="Fraction of samples written as NaN, spikes or text")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    files = generate(args.directory, args.pressure_rows, args.diameter_rows, args.dsc_sheets, args.dsc_rows,
+                     args.seed, args.reject_rate)
+    for kind, (path, rows) in files.items():
+        print(f"{kind}: {path} ({rows} rows, {os.path.getsize(path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+from datetime import datetime, timezone
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..', 'server'))
+from generate_data import generate
+
+# Input sizes per preset: (pressure rows, diameter rows, DSC sheets, DSC rows per sheet)
+SIZE_PRESETS = {
+    "small": (20000, 10000, 2, 5000),
+    "medium": (200000, 100000, 4, 20000),
+    "large": (2000000, 1000000, 8, 100000),
+}
+# Purpose each kind of synthetic input is ingested under, which selects its loader
+CASES = {
+    "pressure": "Parts Quality",
+    "pressure_tdms": "Parts Quality",
+    "diameter": "BenchTop Filament Diameter",
+    "dsc": "Characteristics",
+}
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+
+def remove_loaded_file(conn, filepath):
+    """
+    Deletes everything a benchmark run loaded: the manifest entry (its data rows cascade), the part and the material.
+    """
+    from database_operations import extract_ids_from_filename
+    material_id, _, _, part_id = extract_ids_from_filename(os.path.basename(filepath))
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM filamentquality.ingest_manifest WHERE file_path = %s", (filepath,))
+        cursor.execute("DELETE FROM filamentquality.parts WHERE part_id = %s", (part_id,))
+        cursor.execute("DELETE FROM filamentquality.materials WHERE material_id = %s", (material_id,))
+    conn.commit()
+
+
+def parse_file(filepath, purpose):
+    """
+    Runs only the read and parse stages of a loader, for machines without a database.
+    Returns the number of rows that would be written and the number rejected.
+    """
+    from database_operations import iter_pressure_blocks, iter_long_samples, SAMPLE_BLOCK_SIZE
+    from sample_parsing import RejectReport, iter_line_blocks, parse_numeric_block
+    from thermal_workbook import read_thermal_workbook
+
+    if purpose == "Characteristics":
+        sheets = list(read_thermal_workbook(filepath))
+        return sum(len(sheet) for sheet in sheets), sum(sheet.skipped_rows for sheet in sheets)
+
+    report = RejectReport()
+    rows = 0
+    if purpose == "Parts Quality":
+        for _, _, _, samples in iter_long_samples(iter_pressure_blocks(filepath, report), report):
+            rows += len(samples)
+        return rows, report.total
+
+    with open(filepath, 'r') as file:
+        names = file.readline().rstrip('\n').split(',')[:-1]
+        blocks = ((names, block[:, -1], block[:, :-1])
+                  for block in (parse_numeric_block(lines, ',', range(len(names) + 1), report)
+                                for lines in iter_line_blocks(file, SAMPLE_BLOCK_SIZE)))
+        for _, _, _, samples in iter_long_samples(blocks, report):
+            rows += len(samples)
+    return rows, report.total
+
+
+def measure(filepath, purpose, password, parse_only):
+    """
+    Loads one file and reports its latency, throughput and memory. Runs in a fresh process per measurement,
+    so the peak resident memory is that of this load alone on top of the interpreter and imports.
+    """
+    from database_operations import connect_to_database, ingest_file
+    from metrics import peak_rss_bytes
+
+    conn = None if parse_only else connect_to_database(password)
+    if not parse_only and conn is None:
+        return {"status": "Failed", "error": "No DB connection"}
+    rss_before = peak_rss_bytes()
+    started = time.perf_counter()
+    try:
+        if parse_only:
+            rows, rejected = parse_file(filepath, purpose)
+            result = {"status": "Success", "rows": rows, "rows_rejected": rejected}
+        else:
+            result = ingest_file(filepath, purpose, conn)
+        seconds = time.perf_counter() - started
+        rss_after = peak_rss_bytes()
+    finally:
+        if conn is not None:
+            remove_loaded_file(conn, filepath)
+            conn.close()
+
+    measurement = {
+        "status": result["status"],
+        "rows": result.get("rows", 0),
+        "rows_rejected": result.get("rows_rejected", 0),
+        "seconds": round(seconds, 6),
+        "peak_rss_bytes": rss_after,
+        "rss_growth_bytes": rss_after - rss_before if rss_after is not None else None,
+    }
+    if "timings" in result:
+        measurement["stages"] = result["timings"]["stages"]
+    if "error" in result:
+        measurement["error"] = result["error"]
+    return measurement
+
+
+def _summarize(kind, filepath, runs):
+    succeeded = [run for run in runs if run["status"] == "Success"]
+    summary = {"case": kind, "purpose": CASES[kind], "file_bytes": os.path.getsize(filepath), "runs": runs}
+    if not succeeded:
+        return summary
+    seconds = [run["seconds"] for run in succeeded]
+    median = statistics.median(seconds)
+    rows = succeeded[0]["rows"]
+    summary.update({
+        "rows": rows,
+        "rows_rejected": succeeded[0]["rows_rejected"],
+        "median_seconds": round(median, 6),
+        "min_seconds": round(min(seconds), 6),
+        "max_seconds": round(max(seconds), 6),
+        "rows_per_second": round(rows / median, 1) if median > 0 else None,
+        "mb_per_second": round(summary["file_bytes"] / median / 1e6, 2) if median > 0 else None,
+        "peak_rss_mb": round(max(run["peak_rss_bytes"] or 0 for run in succeeded) / 1e6, 1),
+        "rss_growth_mb": round(max(run["rss_growth_bytes"] or 0 for run in succeeded) / 1e6, 1),
+    })
+    if "stages" in succeeded[0]:
+        summary["median_stage_seconds"] = {
+            stage: round(statistics.median(run["stages"][stage] for run in succeeded), 6)
+            for stage in succeeded[0]["stages"]
+        }
+    return summary
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(cases, size, repeat, password, parse_only, data_dir=None, reject_rate=0.0, seed=0):
+    """
+    Generates the inputs once and loads each of them repeat times, every time in a new process.
+    Returns the report as a dictionary.
+    """
+    import numpy as np
+    pressure_rows, diameter_rows, dsc_sheets, dsc_rows = SIZE_PRESETS[size]
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='ingest-bench-') as scratch_dir:
+        files = generate(data_dir or scratch_dir, pressure_rows, diameter_rows, dsc_sheets, dsc_rows, seed, reject_rate,
+                         tag=f"b{uuid.uuid4().hex[:8]}")
+        results = []
+        for kind in cases:
+            filepath, _ = files[kind]
+            runs = []
+            for _ in range(repeat):
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(measure, (filepath, CASES[kind], password, parse_only)))
+            summary = _summarize(kind, filepath, runs)
+            results.append(summary)
+            print(f"{kind}: {summary.get('rows', 0)} rows, median {summary.get('median_seconds')}s, "
+                  f"{summary.get('rows_per_second')} rows/s, peak {summary.get('peak_rss_mb')} MB")
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "size": size,
+        "sizes": dict(zip(("pressure_rows", "diameter_rows", "dsc_sheets", "dsc_rows_per_sheet"), SIZE_PRESETS[size])),
+        "repeat": repeat,
+        "parse_only": parse_only,
+        "reject_rate": reject_rate,
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    """Prints the change in rows/sec of every case against an earlier report."""
+    previous = {result["case"]: result for result in baseline["results"]}
+    for result in report["results"]:
+        before = previous.get(result["case"], {}).get("rows_per_second")
+        after = result.get("rows_per_second")
+        if before and after:
+            print(f"{result['case']}: {before} -> {after} rows/s ({(after / before - 1) * 100:+.1f}%)")
+        else:
+            print(f"{result['case']}: no comparable result")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pressure, diameter and DSC loaders on synthetic data.")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--size', choices=list(SIZE_PRESETS), default='small')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--password', default=os.environ.get('PGPASSWORD'),
+                        help="PostgreSQL password for the local instance (defaults to $PGPASSWORD)")
+    parser.add_argument('--parse-only', action='store_true', help="Measure reading and parsing without a database")
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="Keep the generated inputs in this directory")
+    parser.add_argument('--output', help="Report path (default: benchmarks/results/ingest-<time>.json)")
+    parser.add_argument('--baseline', help="Earlier report to compare rows/sec against")
+    args = parser.parse_args()
+
+    if not args.parse_only and not args.password:
+        parser.error("--password or $PGPASSWORD is required unless --parse-only is given")
+
+    report = run(args.cases, args.size, args.repeat, args.password, args.parse_only, args.data_dir,
+                 args.reject_rate, args.seed)
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"ingest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,59 @@
+import io
+import os
+import sys
+import time
 import socket
-import json
+import threading
+from contextlib import contextmanager
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.message_framing import send_message, recv_message
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional; only the ExportData helpers need it
+    pa = None
+
+# Seconds between JobStatus polls while an upload runs
+JOB_POLL_INTERVAL = 1.0
+
+
+class _ExportStream(io.RawIOBase):
+    """
+    Read-only file over the binary frames of an ExportData reply, for pyarrow's stream reader.
+    Reading stops at the first JSON message, which ends the export and is kept as the result.
+    """
+    def __init__(self, sock):
+        self.sock = sock
+        self.result = None
+        self._chunk = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._chunk and self.result is None:
+            frame = recv_message(self.sock)
+            if isinstance(frame, bytes):
+                self._chunk = memoryview(frame)
+            else:
+                self.result = frame or {"status": "Error", "message": "Connection closed during export"}
+        count = min(len(buffer), len(self._chunk))
+        buffer[:count] = self._chunk[:count]
+        self._chunk = self._chunk[count:]
+        return count
+
+    def finish(self):
+        """Skips whatever the reader left unread and returns the closing message."""
+        while self.result is None:
+            self._chunk = memoryview(b'')
+            self.readinto(bytearray(0))
+        return self.result
 
 class BackendCommunication:
     def __init__(self):
         self.backend_socket = None
+        # Calls arrive from background threads; each request/response pair must own the socket
+        self.socket_lock = threading.Lock()
         print("BackendCommunication initialized")
 
     def connect_to_backend(self):
@@ -21,14 +71,17 @@ class BackendCommunication:
         try:
             if self.backend_socket:
                 data = {"password": password}  # Adjusted to match backend expectations
-                self.backend_socket.send(json.dumps(data).encode())
-                response = self.backend_socket.recv(1024).decode()
-                response_json = json.loads(response)  # Parse the JSON response
-                print(f"Received password verification response: {response}")
+                with self.socket_lock:
+                    send_message(self.backend_socket, data)
+                    response_json = recv_message(self.backend_socket)
+                print(f"Received password verification response: {response_json}")
                 # Check the status in the JSON response
-                if response_json.get("status") == "Correct":
+                if response_json and response_json.get("status") == "Correct":
                     print("Password correct. Connection established.")
                     return True
+                elif response_json and response_json.get("status") == "Error":
+                    print("Password could not be verified:", response_json.get("message"))
+                    return False
                 else:
                     print("Password incorrect. Please try again.")
                     return False
@@ -46,13 +99,210 @@ class BackendCommunication:
                 "selected_directories": selected_directories
             }
             print("Sending data upload request to the backend:", data)
-            self.backend_socket.send(json.dumps(data).encode())
-            print("Data upload request sent to the backend.")
-
-            # Receive confirmation from the server
-            response = self.backend_socket.recv(1024).decode()
+            # The server replies straight away with the ID of the background upload job
+            with self.socket_lock:
+                send_message(self.backend_socket, data)
+                response = recv_message(self.backend_socket)
             print("Received response from the server:", response)
-            if response == "DataUploaded":
-                print("Data uploaded successfully.")
+            if response and response.get("status") == "JobSubmitted":
+                print("Data upload job submitted:", response["job_id"])
+            return response
         except Exception as e:
             print("Error uploading data:", e)
+
+    def get_job_status(self, job_id):
+        """Returns the progress snapshot of an upload job, or None if it could not be fetched."""
+        response = self._request({"command": "JobStatus", "job_id": job_id})
+        if response and response.get("status") == "JobStatus":
+            return response["job"]
+        return None
+
+    def cancel_job(self, job_id):
+        response = self._request({"command": "CancelJob", "job_id": job_id})
+        return bool(response and response.get("status") == "JobCancelling")
+
+    def start_watch(self, selected_directories):
+        """
+        Makes the server load new files in the purpose directories (and their subdirectories) as they appear.
+        Returns the watch status, or None on error.
+        """
+        response = self._request({"command": "StartWatch", "selected_directories": selected_directories})
+        if response and response.get("status") == "WatchStarted":
+            return response["watch"]
+        print("Error starting directory watch:", response)
+        return None
+
+    def stop_watch(self):
+        response = self._request({"command": "StopWatch"})
+        return bool(response and response.get("status") == "WatchStopped")
+
+    def get_watch_status(self):
+        response = self._request({"command": "WatchStatus"})
+        if response and response.get("status") == "Watch":
+            return response["watch"]
+        return None
+
+    def query_time_series(self, part_id, characteristic, start=None, end=None, max_points=2000,
+                          source="part_characteristics"):
+        """Returns a server-downsampled series as a dict with 'x' and 'y' lists, or None on error."""
+        response = self._request({
+            "command": "QueryTimeSeries",
+            "part_id": part_id,
+            "characteristic": characteristic,
+            "start": start,
+            "end": end,
+            "max_points": max_points,
+            "source": source
+        })
+        if response and response.get("status") == "TimeSeries":
+            return response["series"]
+        print("Error querying time series:", response)
+        return None
+
+    def query_summary(self, part_id=None, material_id=None):
+        """
+        Returns min, max, mean, stddev and count per sample table and characteristic of a part, or of every part
+        of a material, as {source: {characteristic: statistics}}, or None on error.
+        """
+        response = self._request({"command": "QuerySummary", "part_id": part_id, "material_id": material_id})
+        if response and response.get("status") == "Summary":
+            return response["summary"]
+        print("Error querying summary statistics:", response)
+        return None
+
+    @contextmanager
+    def _export_reader(self, source, material_id, part_id, batch_rows, compression):
+        """
+        Sends ExportData and yields a pyarrow stream reader over the reply. Owns the socket until the block exits,
+        then skips any batches left unread. Raises RuntimeError if the server reports an error.
+        """
+        if pa is None:
+            raise RuntimeError("Exporting data needs pyarrow")
+        if self.backend_socket is None:
+            self.connect_to_backend()
+        with self.socket_lock:
+            send_message(self.backend_socket, {
+                "command": "ExportData",
+                "source": source,
+                "material_id": material_id,
+                "part_id": part_id,
+                "batch_rows": batch_rows,
+                "compression": compression
+            })
+            response = recv_message(self.backend_socket)
+            if not response or response.get("status") != "ExportStarted":
+                raise RuntimeError(f"Export failed: {(response or {}).get('message', 'no response')}")
+            stream = _ExportStream(self.backend_socket)
+            try:
+                try:
+                    yield pa.ipc.open_stream(stream)
+                except pa.ArrowInvalid:
+                    if stream.result is None:
+                        raise
+                    # The stream was cut short by the server's closing message; its error is raised below
+            finally:
+                result = stream.finish()
+            if result.get("status") != "ExportComplete":
+                raise RuntimeError(f"Export failed: {result.get('message')}")
+
+    def iter_export(self, source, material_id=None, part_id=None, batch_rows=None, compression=None):
+        """
+        Streams an export of a sample table (e.g. 'part_characteristics' or 'material_thermal_characteristics')
+        for a material or part, yielding pyarrow RecordBatches one at a time. compression may be 'lz4' or 'zstd'.
+        """
+        with self._export_reader(source, material_id, part_id, batch_rows, compression) as reader:
+            yield from reader
+
+    def export_dataframe(self, source, material_id=None, part_id=None, batch_rows=None, compression=None):
+        """Returns an export as a pandas DataFrame."""
+        with self._export_reader(source, material_id, part_id, batch_rows, compression) as reader:
+            table = reader.read_all()
+        return table.to_pandas()
+
+    def export_parquet(self, path, source, material_id=None, part_id=None, batch_rows=None, compression=None):
+        """Writes an export to a Parquet file batch by batch, so exports larger than memory fit. Returns the row count."""
+        import pyarrow.parquet as pq
+        rows = 0
+        with self._export_reader(source, material_id, part_id, batch_rows, compression) as reader:
+            with pq.ParquetWriter(path, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        return rows
+
+    def query_dsc_features(self, material_ids=None):
+        """
+        Returns the glass transition, peak onset and temperature and enthalpy of every loaded DSC ramp of the
+        given materials (all materials if None), one dictionary per ramp, or None on error.
+        """
+        response = self._request({"command": "QueryDscFeatures", "material_ids": material_ids})
+        if response and response.get("status") == "DscFeatures":
+            return response["features"]
+        print("Error querying DSC features:", response)
+        return None
+
+    def archive_part(self, part_id, source="part_characteristics", keep_rows=False):
+        """
+        Moves a part's already loaded pressure or diameter samples into compressed chunks on the server.
+        Returns (samples archived, compressed bytes), or None on error.
+        """
+        response = self._request({"command": "ArchivePart", "part_id": part_id, "source": source,
+                                  "keep_rows": keep_rows})
+        if response and response.get("status") == "PartArchived":
+            return response["samples"], response["compressed_bytes"]
+        print("Error archiving part:", response)
+        return None
+
+    def rebuild_summary_stats(self, source):
+        """
+        Recomputes the summary statistics of one sample table (part_characteristics, benchtop_filament_diameter
+        or live_print_data) from its rows, for data loaded before they were kept. Returns the rows written, or None.
+        """
+        response = self._request({"command": "RebuildSummaryStats", "source": source})
+        if response and response.get("status") == "SummaryStatsRebuilt":
+            return response["rows"]
+        print("Error rebuilding summary statistics:", response)
+        return None
+
+    def rebuild_dsc_features(self, material_id):
+        """
+        Recomputes the glass transition, peak and enthalpy of every DSC ramp loaded for a material, for data
+        loaded before features were extracted. Returns the number of ramps stored, or None.
+        """
+        response = self._request({"command": "RebuildDscFeatures", "material_id": material_id})
+        if response and response.get("status") == "DscFeaturesRebuilt":
+            return response["ramps"]
+        print("Error rebuilding DSC features:", response)
+        return None
+
+    def get_stats(self):
+        """Returns the server's counters, latency histograms and cache/pool state, or None on error."""
+        response = self._request({"command": "Stats"})
+        if response and response.get("status") == "Stats":
+            return response["stats"]
+        return None
+
+    def watch_job(self, job_id, on_progress, interval=JOB_POLL_INTERVAL):
+        """
+        Polls an upload job until it finishes, passing every progress snapshot to on_progress.
+        Blocks, so call it from a background thread. Returns the final snapshot.
+        """
+        while True:
+            progress = self.get_job_status(job_id)
+            if progress is None:
+                return None
+            on_progress(progress)
+            if progress["status"] not in ("Queued", "Running"):
+                return progress
+            time.sleep(interval)
+
+    def _request(self, data):
+        try:
+            if self.backend_socket is None:
+                self.connect_to_backend()
+            with self.socket_lock:
+                send_message(self.backend_socket, data)
+                return recv_message(self.backend_socket)
+        except Exception as e:
+            print(f"Error sending {data.get('command')} request:", e)
+            return None
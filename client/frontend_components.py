@@ -1,3 +1,4 @@
+import os
 from kivy.uix.popup import Popup
 from kivy.uix.button import Button
 from kivy.uix.label import Label
@@ -84,14 +85,29 @@ class DirectorySelectPopup(Popup):
             self.dismiss()  # Close the popup after selection
 
 class ViewUploadDetailsPopup(Popup):
-    def __init__(self, **kwargs):
+    def __init__(self, on_cancel=None, **kwargs):
         super(ViewUploadDetailsPopup, self).__init__(**kwargs)
         self.title = "Upload Details"
         self.size_hint = (0.8, 0.8)
+        self.on_cancel = on_cancel  # Callback that cancels the running upload job
+        self.job_id = None
 
         layout = BoxLayout(orientation='vertical', padding=10)
-        label = Label(text="Upload Details Placeholder")  # Placeholder text
-        layout.add_widget(label)
+        self.status_label = Label(text="No upload in progress.")
+        layout.add_widget(self.status_label)
+
+        self.files_label = Label(text="")
+        layout.add_widget(self.files_label)
+
+        self.rows_label = Label(text="")
+        layout.add_widget(self.rows_label)
+
+        self.errors_label = Label(text="")
+        layout.add_widget(self.errors_label)
+
+        self.cancel_button = Button(text="Cancel Upload", disabled=True)
+        self.cancel_button.bind(on_press=self.cancel_upload)
+        layout.add_widget(self.cancel_button)
 
         close_button = Button(text="Close")
         close_button.bind(on_press=self.dismiss)
@@ -99,6 +115,27 @@ class ViewUploadDetailsPopup(Popup):
 
         self.content = layout
 
+    def update_progress(self, progress):
+        """Shows a job progress snapshot as returned by the server's JobStatus command."""
+        if not progress:
+            return
+        self.job_id = progress["job_id"]
+        self.status_label.text = f"Job {progress['job_id'][:8]}: {progress['status']}"
+        self.files_label.text = (f"Files: {progress['files_done']} / {progress['files_total']} "
+                                 f"({progress.get('files_skipped', 0)} unchanged, {progress['files_failed']} failed)")
+        self.rows_label.text = (f"Rows written: {progress['rows_written']} ({progress['rows_per_second']:.0f} rows/sec), "
+                                f"{progress.get('rows_rejected', 0)} rejected")
+        errors = progress.get("errors", [])
+        self.errors_label.text = "\n".join(
+            f"{os.path.basename(error['file'] or '')}: {error['error']}" for error in errors[-3:]
+        )
+        self.cancel_button.disabled = progress["status"] not in ("Queued", "Running") or self.on_cancel is None
+
+    def cancel_upload(self, instance):
+        if self.job_id and self.on_cancel:
+            self.cancel_button.disabled = True
+            self.on_cancel(self.job_id)
+
 
 class PasswordPopup(Popup):
     def __init__(self, callback, **kwargs):
@@ -156,14 +193,6 @@ class ErrorPopup(Popup):
         self.on_retry()  # Call the retry function
         self.dismiss()  # Dismiss the error popup
 
-class ViewUploadDetailsPopup(Popup):
-    def __init__(self, **kwargs):
-        super(ViewUploadDetailsPopup, self).__init__(**kwargs)
-        self.title = 'Custom Popup Window'
-        self.size_hint = (None, None)
-        self.size = (400, 400)  # Specify the size of the popup
-        self.content = Label(text='This is a custom popup!')
-
 class ViewDataPopup(Popup):
     def __init__(self, **kwargs):
         super(ViewDataPopup, self).__init__(**kwargs)
@@ -1,4 +1,6 @@
+import threading
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 import webbrowser
@@ -18,6 +20,8 @@ class PostgreSQLApp(App):
             "Parts Quality": ""
         }
         self.uploading_data = False  # Track if data is being uploaded
+        self.upload_progress = None  # Latest JobStatus snapshot of the current or last upload
+        self.upload_details_popup = None
         self.buttons = {}  # Dictionary to store buttons
 
     def build(self):
@@ -29,9 +33,23 @@ class PostgreSQLApp(App):
         self.password_popup = PasswordPopup(callback=self.submit_password)
         self.password_popup.open()
 
+    def run_in_background(self, func, *args, on_done=None):
+        """
+        Runs a blocking backend call on a worker thread so the UI stays responsive.
+        on_done is called with the result on the Kivy UI thread.
+        """
+        def worker():
+            result = func(*args)
+            if on_done:
+                Clock.schedule_once(lambda dt: on_done(result))
+        threading.Thread(target=worker, daemon=True).start()
+
     def submit_password(self, password):
         self.backend_communication = BackendCommunication()
-        if self.backend_communication.verify_password(password):
+        self.run_in_background(self.backend_communication.verify_password, password, on_done=self.password_verified)
+
+    def password_verified(self, correct):
+        if correct:
             print("Password correct. You can now upload data.")
             self.show_buttons()
         else:
@@ -50,11 +68,35 @@ class PostgreSQLApp(App):
             print("Data upload in progress. Please wait.")
             return
         self.uploading_data = True
-        try:
-            self.backend_communication.upload_data(self.selected_directories)
-        finally:
-            self.uploading_data = False
-            self.reset_selected_directories()
+        selected_directories = dict(self.selected_directories)
+        self.reset_selected_directories()  # Operators can pick the next directories while this upload runs
+        self.run_in_background(self.run_upload, selected_directories, on_done=self.upload_finished)
+
+    def run_upload(self, selected_directories):
+        """Submits the upload job and follows its progress. Runs on a background thread."""
+        response = self.backend_communication.upload_data(selected_directories)
+        if not response or response.get("status") != "JobSubmitted":
+            return None
+        return self.backend_communication.watch_job(
+            response["job_id"],
+            lambda progress: Clock.schedule_once(lambda dt: self.show_upload_progress(progress))
+        )
+
+    def show_upload_progress(self, progress):
+        self.upload_progress = progress
+        if self.upload_details_popup:
+            self.upload_details_popup.update_progress(progress)
+
+    def upload_finished(self, progress):
+        self.uploading_data = False
+        if progress is None:
+            print("Data upload could not be started or its progress was lost.")
+            return
+        self.show_upload_progress(progress)
+        print(f"Data upload {progress['status'].lower()}: {progress['files_done']} files, {progress['rows_written']} rows.")
+
+    def cancel_upload(self, job_id):
+        self.run_in_background(self.backend_communication.cancel_job, job_id)
 
     def open_directory_selector(self, purpose):
         popup = DirectorySelectPopup(callback=self.select_directory_callback, purpose=purpose)
@@ -111,8 +153,13 @@ class PostgreSQLApp(App):
         webbrowser.open('http://yourwebapp.com')  # Update with your web application's URL
 
     def view_upload_details(self, instance):
-        popup = ViewUploadDetailsPopup()
-        popup.open()
+        self.upload_details_popup = ViewUploadDetailsPopup(on_cancel=self.cancel_upload)
+        self.upload_details_popup.bind(on_dismiss=self.upload_details_closed)
+        self.upload_details_popup.update_progress(self.upload_progress)
+        self.upload_details_popup.open()
+
+    def upload_details_closed(self, instance):
+        self.upload_details_popup = None
 
     def show_password_error(self):
         error_popup = ErrorPopup(
@@ -0,0 +1,139 @@
+"""
+Length-prefixed message framing shared by the server and the Kivy client.
+
+Every message is a 5-byte header followed by the body:
+    4 bytes  body length, unsigned big-endian
+    1 byte   flags (FLAG_COMPRESSED: body is zlib-compressed, FLAG_BINARY: body is raw bytes)
+The body is a UTF-8 encoded JSON document, or opaque bytes in binary frames such as the Arrow
+stream chunks of an export, which are passed to the receiver as bytes instead of being parsed.
+"""
+import asyncio
+import json
+import struct
+import zlib
+
+HEADER = struct.Struct('!IB')
+FLAG_COMPRESSED = 0x01
+FLAG_BINARY = 0x02
+# Bodies larger than this are compressed unless the sender says otherwise
+COMPRESSION_THRESHOLD = 64 * 1024
+# Refuse to allocate buffers for bodies larger than this
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(message, compress=None):
+    """
+    Serializes a JSON-compatible message into a single framed byte string.
+    compress=None compresses only bodies above COMPRESSION_THRESHOLD.
+    """
+    body = json.dumps(message).encode('utf-8')
+    flags = 0
+    if compress or (compress is None and len(body) > COMPRESSION_THRESHOLD):
+        body = zlib.compress(body)
+        flags |= FLAG_COMPRESSED
+    if len(body) > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message of {len(body)} bytes exceeds the {MAX_MESSAGE_SIZE} byte limit")
+    return HEADER.pack(len(body), flags) + body
+
+
+def encode_binary(data):
+    """Frames a bytes-like object as a binary message, uncompressed."""
+    if len(data) > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Binary frame of {len(data)} bytes exceeds the {MAX_MESSAGE_SIZE} byte limit")
+    return HEADER.pack(len(data), FLAG_BINARY) + data
+
+
+def decode_header(header):
+    length, flags = HEADER.unpack(header)
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Announced message of {length} bytes exceeds the {MAX_MESSAGE_SIZE} byte limit")
+    return length, flags
+
+
+def _decompress(body):
+    """Inflates a compressed body without ever producing more than MAX_MESSAGE_SIZE bytes."""
+    decompressor = zlib.decompressobj()
+    try:
+        data = decompressor.decompress(body, MAX_MESSAGE_SIZE)
+    except zlib.error as e:
+        raise ProtocolError(f"Malformed compressed body: {e}")
+    if decompressor.unconsumed_tail:
+        raise ProtocolError(f"Decompressed message exceeds the {MAX_MESSAGE_SIZE} byte limit")
+    if not decompressor.eof:
+        raise ProtocolError("Truncated compressed body")
+    return data
+
+
+def decode_body(body, flags):
+    if flags & FLAG_COMPRESSED:
+        body = _decompress(body)
+    if flags & FLAG_BINARY:
+        return body
+    try:
+        return json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ProtocolError(f"Malformed message body: {e}")
+
+
+def send_message(sock, message, compress=None):
+    sock.sendall(encode_message(message, compress))
+
+
+def recv_message(sock):
+    """
+    Reads one complete message from a blocking socket; binary frames are returned as bytes.
+    Returns None if the peer closed the connection cleanly between messages.
+    """
+    header = _recv_exactly(sock, HEADER.size, allow_eof=True)
+    if header is None:
+        return None
+    length, flags = decode_header(header)
+    return decode_body(_recv_exactly(sock, length), flags)
+
+
+async def read_message(reader):
+    """
+    Reads one complete message from an asyncio StreamReader.
+    Returns None if the peer closed the connection cleanly between messages.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolError(f"Connection closed after {len(e.partial)} of {HEADER.size} header bytes")
+    length, flags = decode_header(header)
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise ProtocolError(f"Connection closed after {len(e.partial)} of {length} bytes")
+    return decode_body(body, flags)
+
+
+async def write_message(writer, message, compress=None):
+    writer.write(encode_message(message, compress))
+    await writer.drain()
+
+
+async def write_binary(writer, data):
+    """Sends a binary frame, waiting while the peer is slower than the sender so buffered data stays bounded."""
+    writer.write(encode_binary(data))
+    await writer.drain()
+
+
+def _recv_exactly(sock, size, allow_eof=False):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            if allow_eof and received == 0:
+                return None
+            raise ProtocolError(f"Connection closed after {received} of {size} bytes")
+        received += count
+    return bytes(buffer)
@@ -0,0 +1,199 @@
+import hashlib
+import threading
+import time
+import logging
+from contextlib import contextmanager
+import psycopg2
+from database_operations import connect_to_database
+
+# Upper bound on open connections per set of credentials
+POOL_MAX_CONNECTIONS = 10
+# Idle connections older than this many seconds are closed
+POOL_IDLE_TIMEOUT = 300
+# Seconds a caller waits for a free connection before giving up
+POOL_CHECKOUT_TIMEOUT = 30
+# Connections idle for longer than this many seconds are pinged before being handed out
+POOL_HEALTH_CHECK_INTERVAL = 30
+# Connection slots reserve() leaves free for queries, logins and live ingest while a parallel upload runs
+POOL_RESERVE_HEADROOM = 2
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections that all use the same credentials.
+    Connections are health-checked on checkout, closed after sitting idle too long,
+    and callers wait at most checkout_timeout seconds for one to become free.
+    """
+    def __init__(self, password, max_connections=POOL_MAX_CONNECTIONS, idle_timeout=POOL_IDLE_TIMEOUT,
+                 checkout_timeout=POOL_CHECKOUT_TIMEOUT):
+        self.password = password
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._idle = []  # (conn, last_used) pairs, most recently used last
+        self._size = 0  # Open connections, idle or checked out
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Returns a healthy connection, or None if a new connection could not be opened.
+        Raises PoolTimeoutError if none becomes free within the timeout.
+        """
+        deadline = time.monotonic() + (self.checkout_timeout if timeout is None else timeout)
+        while True:
+            conn, last_used = None, None
+            with self._condition:
+                while True:
+                    self._evict_idle_locked()
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_connections:
+                        self._size += 1  # Reserve the slot before connecting outside the lock
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"No database connection available after {self.checkout_timeout}s")
+                    self._condition.wait(remaining)
+
+            if conn is None:
+                conn = connect_to_database(self.password)
+                if conn is None:
+                    self._discard(None)
+                return conn
+            if self._is_healthy(conn, last_used):
+                return conn
+            logging.warning("Discarding unhealthy pooled database connection.")
+            self._discard(conn)
+
+    def release(self, conn):
+        if conn is None:
+            return
+        try:
+            if not conn.closed and conn.status != psycopg2.extensions.STATUS_READY:
+                conn.rollback()  # Never hand out a connection with an open or aborted transaction
+        except psycopg2.Error:
+            pass
+        if conn.closed:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def reserve(self, count, headroom=POOL_RESERVE_HEADROOM):
+        """
+        Holds up to count connection slots for connections opened elsewhere, such as by ingest worker processes,
+        so they count against max_connections. Only slots beyond headroom that are not checked out are taken, so
+        other sessions can still get a connection; idle connections are closed to make room. Does not wait, and
+        yields the number of slots held, which may be 0.
+        """
+        with self._condition:
+            self._evict_idle_locked()
+            in_use = self._size - len(self._idle)
+            reserved = max(0, min(count, self.max_connections - headroom - in_use))
+            surplus = max(0, reserved - (self.max_connections - self._size))
+            closing, self._idle = self._idle[:surplus], self._idle[surplus:]  # Oldest idle connections first
+            self._size += reserved - surplus
+        for conn, _ in closing:
+            conn.close()
+        try:
+            yield reserved
+        finally:
+            with self._condition:
+                self._size -= reserved
+                self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self):
+        with self._condition:
+            return {"open": self._size, "idle": len(self._idle), "in_use": self._size - len(self._idle),
+                    "max": self.max_connections}
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < POOL_HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        if conn is not None and not conn.closed:
+            conn.close()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _evict_idle_locked(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:  # Oldest connections are at the front
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            conn.close()
+            logging.info("Closed idle pooled database connection.")
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _credentials_key(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def authenticate(password):
+    """
+    Returns the pool for these credentials, creating it if a test connection succeeds.
+    Returns None if the credentials are rejected, so failed logins never leave a pool behind.
+    """
+    key = _credentials_key(password)
+    with _pools_lock:
+        pool = _pools.get(key)
+    if pool is None:
+        pool = ConnectionPool(password)
+    conn = pool.acquire()
+    if conn is None:
+        return None
+    pool.release(conn)
+    with _pools_lock:
+        registered = _pools.setdefault(key, pool)
+    if registered is not pool:  # Another session registered these credentials first
+        pool.close()
+    return registered
+
+def pool_stats():
+    """Usage of every open pool, without the credentials it is keyed by."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,129 @@
+import uuid
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional; ExportData answers with an error when it is missing
+    pa = None
+
+# Rows fetched from the named cursor and sent per Arrow record batch; bounds the memory of an export on both ends
+EXPORT_BATCH_ROWS = 65536
+# Largest batch a client may ask for, so a batch always fits in one binary frame
+EXPORT_MAX_BATCH_ROWS = 1000000
+
+# Tables that can be exported: (query, output columns with their Arrow types, filter column per request key).
+# Rows are streamed in storage order; an ORDER BY would make PostgreSQL sort the whole result before the first row.
+EXPORT_SOURCES = {
+    "material_thermal_characteristics": (
+        "SELECT t.material_id, t.dsc_ramp, t.time_min, t.temperature, t.heat_flow "
+        "FROM filamentquality.material_thermal_characteristics t",
+        (("material_id", "string"), ("dsc_ramp", "string"), ("time_min", "float32"),
+         ("temperature", "float32"), ("heat_flow", "float32")),
+        {"material_id": "t.material_id"},
+    ),
+    "part_characteristics": (
+        "SELECT s.part_id, s.time_elapsed, c.characteristic_name, s.characteristic_value "
+        "FROM filamentquality.part_characteristics s "
+        "JOIN filamentquality.characteristics c ON c.characteristic_id = s.characteristic_id "
+        "JOIN filamentquality.parts p ON p.part_id = s.part_id",
+        (("part_id", "string"), ("time_elapsed", "float32"), ("characteristic", "string"), ("value", "float32")),
+        {"material_id": "p.material_id", "part_id": "s.part_id"},
+    ),
+    "benchtop_filament_diameter": (
+        "SELECT s.part_id, s.position, c.characteristic_name, s.characteristic_value "
+        "FROM filamentquality.benchtop_filament_diameter s "
+        "JOIN filamentquality.characteristics c ON c.characteristic_id = s.characteristic_id "
+        "JOIN filamentquality.parts p ON p.part_id = s.part_id",
+        (("part_id", "string"), ("position", "float32"), ("characteristic", "string"), ("value", "float32")),
+        {"material_id": "p.material_id", "part_id": "s.part_id"},
+    ),
+    "live_print_data": (
+        "SELECT s.part_id, s.time_stamp, c.characteristic_name, s.characteristic_value "
+        "FROM filamentquality.live_print_data s "
+        "JOIN filamentquality.characteristics c ON c.characteristic_id = s.characteristic_id "
+        "JOIN filamentquality.parts p ON p.part_id = s.part_id",
+        (("part_id", "string"), ("time_stamp", "float32"), ("characteristic", "string"), ("value", "float32")),
+        {"material_id": "p.material_id", "part_id": "s.part_id"},
+    ),
+}
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the Arrow stream writer produced since the last drain()."""
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def build_export_query(source, filters):
+    """Returns (SQL, parameters, Arrow schema) for an export of source restricted by the given filter values."""
+    if pa is None:
+        raise ValueError("Export needs pyarrow, which is not installed on the server")
+    if source not in EXPORT_SOURCES:
+        raise ValueError(f"Unknown export source: {source}")
+    query, columns, filter_columns = EXPORT_SOURCES[source]
+    conditions, params = [], []
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if key not in filter_columns:
+            raise ValueError(f"{source} cannot be filtered by {key}")
+        conditions.append(f"{filter_columns[key]} = %s")
+        params.append(value)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    schema = pa.schema([(name, getattr(pa, arrow_type)()) for name, arrow_type in columns])
+    return query, params, schema
+
+
+def export_batches(conn, source, filters, batch_rows=EXPORT_BATCH_ROWS, compression=None):
+    """
+    Streams the rows of an export as an Arrow IPC stream, read through a server-side named cursor so only
+    batch_rows rows are held at a time. Yields (stream bytes, rows) pairs: the schema first, one pair per record
+    batch, and the end-of-stream marker last. compression ('lz4' or 'zstd') compresses the record batch buffers.
+    """
+    query, params, schema = build_export_query(source, filters)
+    batch_rows = max(1, min(int(batch_rows), EXPORT_MAX_BATCH_ROWS))
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    sink = _ChunkSink()
+    with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cursor:
+        cursor.itersize = batch_rows
+        cursor.execute(query, params)
+        with pa.ipc.new_stream(sink, schema, options=options) as writer:
+            yield sink.drain(), 0
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                yield sink.drain(), len(rows)
+        yield sink.drain(), 0
+
+
+def stream_export(pool, source, filters, batch_rows=EXPORT_BATCH_ROWS, compression=None):
+    """
+    export_batches on a connection borrowed from the pool for as long as the export runs.
+    Each next() blocks on the database, so the socket server calls it on its database executor.
+    """
+    with pool.connection() as conn:
+        if not conn:
+            raise ConnectionError("No DB connection")
+        try:
+            yield from export_batches(conn, source, filters, batch_rows, compression)
+        finally:
+            conn.rollback()  # Closes the named cursor's transaction
@@ -1,10 +1,24 @@
 import psycopg2
 import os
+import io
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import json
 import csv
-import pandas as pd
-import xlrd
+import itertools
+import numpy as np
 import logging
+from thermal_workbook import read_thermal_workbook
+from sample_parsing import RejectReport, iter_line_blocks, parse_numeric_block, validate_samples, wide_to_long
+from metrics import track_file, stage, timed_iter, add_bytes_read, log_rate_limited
+from tdms_reader import TdmsFile, is_tdms_file
+from series_archive import SeriesArchiveWriter, SERIES_STORAGE_MODE
+from ingest_pipeline import pipelined
+from dimension_cache import dimensions
+from summary_stats import SummaryStats
+from dsc_features import extract_ramp_features, write_ramp_features
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,6 +31,22 @@ directories = {
     "Parts Quality": {"pressure": ""}
 }
 
+# Number of rows buffered in memory before each COPY round trip
+BULK_WRITE_BATCH_SIZE = 50000
+# Number of data lines parsed and validated per block when streaming pressure and diameter files
+SAMPLE_BLOCK_SIZE = 50000
+# Channels of a Parts Quality file loaded as characteristics, from text logs and binary TDMS files alike
+PRESSURE_CHANNELS = ('Temp (C)', 'Pressure', 'Flow SLPM (Filtered)')
+# Elapsed time column of text logs; TDMS files without such a channel use the waveform timing instead
+PRESSURE_TIME_CHANNEL = 'X_Value'
+# Bytes read per step when hashing files for the ingest manifest
+HASH_BLOCK_SIZE = 1024 * 1024
+# Worker processes used by process_files_in_directory when a password is supplied for parallel ingestion
+INGEST_WORKERS = os.cpu_count() or 1
+# Start method of ingestion worker processes. Forking the threaded server could hand a child a module lock held
+# by another thread (characteristic cache, dimension cache, rate-limited log), so workers start from a fork server
+INGEST_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
 def connect_to_database(password):
     try:
         db_params = {
@@ -34,6 +64,73 @@ def connect_to_database(password):
         logger.error("Error connecting to PostgreSQL database: %s", e)
         return None
 
+def bulk_write_rows(conn, table, columns, rows, batch_size=BULK_WRITE_BATCH_SIZE):
+    """
+    Streams rows into the given table with COPY ... FROM STDIN, one batch of batch_size rows per round trip.
+    Does not commit: ingest_file owns the transaction so each file is written atomically.
+    Returns the number of rows written.
+    """
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    total_rows, pending_rows = 0, 0
+
+    with conn.cursor() as cursor:
+        def flush():
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+
+        for row in rows:
+            writer.writerow(row)
+            pending_rows += 1
+            if pending_rows >= batch_size:
+                flush()
+                total_rows += pending_rows
+                pending_rows = 0
+        if pending_rows:
+            flush()
+            total_rows += pending_rows
+
+    return total_rows
+
+def bulk_write_columns(conn, table, columns, values, batch_size=BULK_WRITE_BATCH_SIZE):
+    """
+    Columnar counterpart of bulk_write_rows. Each entry of values is either a 1-D NumPy array holding
+    one value per row or a scalar repeated on every row. Returns the number of rows written.
+    """
+    length = next((len(value) for value in values if isinstance(value, np.ndarray)), 0)
+    rows = zip(*(
+        value.tolist() if isinstance(value, np.ndarray) else itertools.repeat(value, length)
+        for value in values
+    ))
+    return bulk_write_rows(conn, table, columns, rows, batch_size)
+
+def open_series_archive(conn, source, part_id):
+    """
+    Returns a SeriesArchiveWriter for the part when SERIES_STORAGE_MODE keeps compressed chunks, otherwise None.
+    """
+    if SERIES_STORAGE_MODE not in ('rows', 'archive', 'both'):
+        raise ValueError(f"Unknown series storage mode: {SERIES_STORAGE_MODE}")
+    return SeriesArchiveWriter(conn, source, part_id) if SERIES_STORAGE_MODE != 'rows' else None
+
+def write_sample_block(conn, source, axis_column, part_id, axis, characteristic_ids, values, archive):
+    """
+    Stores one block of long samples as rows of the source table, as archive chunks, or both, following
+    SERIES_STORAGE_MODE. Returns the number of samples stored.
+    """
+    if archive is not None:
+        archive.append(axis, characteristic_ids, values)
+        if SERIES_STORAGE_MODE == 'archive':
+            return len(values)
+    return bulk_write_columns(
+        conn,
+        f'filamentquality.{source}',
+        ('part_id', axis_column, 'characteristic_id', 'characteristic_value'),
+        (part_id, axis, characteristic_ids, values)
+    )
+
 def extract_ids_from_filename(filename):
     """
     Extracts material_id, material, vendor, and color from the filename.
@@ -55,49 +152,203 @@ def extract_ids_from_filename(filename):
     
     return material_id, vendor, material, color
 
-def insert_material_if_not_exists(conn, material_id, vendor):
+def ensure_dimensions(conn, material_id, vendor, part_id=None, part_type=None):
+    """
+    Makes sure the material, and the part when part_id is given, exist before data rows reference them.
+    Keys already known to the process-wide DimensionCache cost nothing; missing ones are upserted in a single
+    round trip inside the file's transaction (see ingest_file), so errors propagate instead of being rolled back here.
+    """
     try:
-        with conn.cursor() as cursor:
+        materials, parts = dimensions.ensure(conn, material_id, vendor, part_id, part_type)
+    except psycopg2.Error as e:
+        logger.error(f"Error ensuring material ID '{material_id}' and part ID '{part_id}': {e}")
+        raise
+    if materials:
+        logger.info(f"Material ID '{material_id}' with vendor '{vendor}' ensured in database.")
+    if parts:
+        logger.info(f"Part ID '{part_id}' with material ID '{material_id}' and part type '{part_type}' ensured in database.")
+
+# characteristic_name -> characteristic_id, shared by every loader in the process
+_characteristic_ids = {}
+_characteristic_ids_lock = threading.Lock()
+
+def resolve_characteristic_ids(conn, names):
+    """
+    Maps characteristic names to their IDs in the characteristics dictionary, adding names that are new.
+    Known names are answered from an in-process cache; on a miss the whole (small) dictionary is re-read.
+    Names created by this call are not cached until they are read back after commit.
+    """
+    with _characteristic_ids_lock:
+        ids = {name: _characteristic_ids[name] for name in names if name in _characteristic_ids}
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT characteristic_name, characteristic_id FROM filamentquality.characteristics")
+        known = dict(cursor.fetchall())
+        with _characteristic_ids_lock:
+            _characteristic_ids.update(known)
+        ids.update((name, known[name]) for name in missing if name in known)
+
+        new_names = [name for name in missing if name not in known]
+        if new_names:
             cursor.execute(
-                "INSERT INTO filamentquality.materials (material_id, vendor) VALUES (%s, %s) ON CONFLICT DO NOTHING;",
-                (material_id, vendor)
+                "INSERT INTO filamentquality.characteristics (characteristic_name) SELECT unnest(%s::varchar[]) "
+                "ON CONFLICT (characteristic_name) DO NOTHING",
+                (new_names,)
             )
-            conn.commit()
-            logger.info(f"Material ID '{material_id}' with vendor '{vendor}' ensured in database.")
-    except Exception as e:
-        logger.error(f"Error ensuring material ID '{material_id}' with vendor '{vendor}': {e}")
-        conn.rollback()
+            cursor.execute(
+                "SELECT characteristic_name, characteristic_id FROM filamentquality.characteristics WHERE characteristic_name = ANY(%s)",
+                (new_names,)
+            )
+            ids.update(cursor.fetchall())
+            logger.info(f"Added characteristics to dictionary: {', '.join(new_names)}")
+    return ids
+
+def clear_characteristic_cache():
+    """Drops cached IDs; called after a rollback, which may have discarded names read within that transaction."""
+    with _characteristic_ids_lock:
+        _characteristic_ids.clear()
+
+def hash_file(filepath):
+    sha256 = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def manifest_path(filepath):
+    """
+    The path a file is recorded under in the manifest: absolute with symlinks resolved, so the same file reached
+    through a relative path, a link or another mount point of the same directory has one entry.
+    """
+    return os.path.realpath(filepath)
 
-def insert_part_if_applicable(conn, part_id, material_id, vendor, part_type):
+def find_manifest_entry(conn, filepath):
+    """
+    Returns (source_file_id, file_size, file_mtime_ns, content_hash) for a previously loaded file, or None.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT source_file_id, file_size, file_mtime_ns, content_hash FROM filamentquality.ingest_manifest WHERE file_path = %s",
+            (manifest_path(filepath),)
+        )
+        return cursor.fetchone()
+
+def register_manifest_entry(conn, filepath, purpose, file_stat, content_hash, previous_entry):
+    """
+    Records the file in the manifest and tags every row written for the rest of the transaction with its source_file_id.
+    Deleting the previous entry cascades to all rows loaded from the old version of the file,
+    so a modified file is replaced atomically when the transaction commits.
+    """
+    with conn.cursor() as cursor:
+        if previous_entry:
+            cursor.execute("DELETE FROM filamentquality.ingest_manifest WHERE source_file_id = %s", (previous_entry[0],))
+        cursor.execute(
+            "INSERT INTO filamentquality.ingest_manifest (file_path, purpose, file_size, file_mtime_ns, content_hash) "
+            "VALUES (%s, %s, %s, %s, %s) RETURNING source_file_id",
+            (manifest_path(filepath), purpose, file_stat.st_size, file_stat.st_mtime_ns, content_hash)
+        )
+        source_file_id = cursor.fetchone()[0]
+        # Read by the source_file_id column defaults of the data tables; cleared automatically at commit or rollback
+        cursor.execute("SELECT set_config('filamentquality.source_file_id', %s, true)", (str(source_file_id),))
+    return source_file_id
+      
+def list_files_for_purpose(directory, purpose):
+    """
+    Returns the paths of files in the directory whose extension matches the purpose's loader.
+    """
+    config = PURPOSE_MAPPING[purpose]
+    files = os.listdir(directory)
+    logger.info(f"Found {len(files)} files in directory {directory} for processing.")
+    return [
+        os.path.join(directory, filename)
+        for filename in files
+        if any(filename.endswith(ext) for ext in config['extensions'])
+    ]
+
+def ingest_file(filepath, purpose, conn):
+    """
+    Runs the purpose's loader on a single file in one transaction and reports the outcome as a result dictionary.
+    Files whose size and modification time match the manifest are skipped without being read;
+    files that were touched but whose content hash is unchanged are skipped after hashing.
+    Loaders return a row count, or a (row count, RejectReport) pair when they validate samples.
+    """
+    filename = os.path.basename(filepath)
+    with track_file() as timings:
+        result = _ingest_file(filepath, purpose, conn, filename)
+        result["timings"] = timings.as_dict()
+    return result
+
+def _ingest_file(filepath, purpose, conn, filename):
     try:
+        file_stat = os.stat(filepath)
+        entry = find_manifest_entry(conn, filepath)
+        if entry and entry[1] == file_stat.st_size and entry[2] == file_stat.st_mtime_ns:
+            conn.rollback()
+            log_rate_limited(logger, logging.INFO, "skip-unchanged", "Skipping unchanged file: %s", filename)
+            return {"file": filepath, "purpose": purpose, "status": "Skipped", "rows": 0}
+
+        with stage('read'):
+            content_hash = hash_file(filepath)
+        add_bytes_read(file_stat.st_size)  # Counted once per file, although loading reads it again after hashing
+        if entry and entry[3] == content_hash:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE filamentquality.ingest_manifest SET file_size = %s, file_mtime_ns = %s WHERE source_file_id = %s",
+                    (file_stat.st_size, file_stat.st_mtime_ns, entry[0])
+                )
+            conn.commit()
+            log_rate_limited(logger, logging.INFO, "skip-same-content", "Skipping file with unchanged content: %s", filename)
+            return {"file": filepath, "purpose": purpose, "status": "Skipped", "rows": 0}
+
+        logger.info(f"{'Replacing' if entry else 'Processing'} file: {filename} for purpose: {purpose}")
+        source_file_id = register_manifest_entry(conn, filepath, purpose, file_stat, content_hash, entry)
+        loaded = PURPOSE_MAPPING[purpose]['loader'](filepath, conn)
+        rows, rejects = loaded if isinstance(loaded, tuple) else (loaded or 0, RejectReport())
         with conn.cursor() as cursor:
             cursor.execute(
-                "INSERT INTO filamentquality.parts (part_id, material_id, vendor, part_type) VALUES (%s, %s, %s, %s) ON CONFLICT (part_id) DO NOTHING;",
-                (part_id, material_id, vendor, part_type)
+                "UPDATE filamentquality.ingest_manifest SET rows_loaded = %s, rows_rejected = %s WHERE source_file_id = %s",
+                (rows, rejects.total, source_file_id)
             )
+        with stage('commit'):
             conn.commit()
-            logger.info(f"Part ID '{part_id}' with material ID '{material_id}', vendor '{vendor}', and part type '{part_type}' inserted successfully.")
-    except psycopg2.Error as e:
-        logger.error(f"Error inserting part ID '{part_id}': {e}")
+        dimensions.commit(conn)
+        material_id, _, _, part_id = extract_ids_from_filename(filename)
+        return {"file": filepath, "purpose": purpose, "status": "Success", "rows": rows,
+                "rows_rejected": rejects.total, "rejects": rejects.as_dict(),
+                "material_id": material_id, "part_id": part_id if PURPOSE_MAPPING[purpose]['part_data'] else None}
+    except Exception as e:
         conn.rollback()
-      
+        dimensions.rollback(conn)
+        if isinstance(e, psycopg2.errors.ForeignKeyViolation):
+            dimensions.clear()  # A cached material or part was deleted; re-read them on the next file
+        clear_characteristic_cache()
+        logger.error(f"Failed to process file {filename} for purpose {purpose}: {e}")
+        return {"file": filepath, "purpose": purpose, "status": "Failed", "error": str(e)}
+
 def process_data_for_purpose(directory, purpose, conn):
     """
     Process data in the specified directory based on the purpose by mapping the purpose to its loader function.
+    Returns one result dictionary per file.
     """
     if purpose in PURPOSE_MAPPING:
-        config = PURPOSE_MAPPING[purpose]
-        files = os.listdir(directory)
-        logger.info(f"Found {len(files)} files in directory {directory} for processing.")
-        for filename in filter(lambda f: any(f.endswith(ext) for ext in config['extensions']), files):
-            filepath = os.path.join(directory, filename)
-            try:
-                logger.info(f"Processing file: {filename} for purpose: {purpose}")
-                config['loader'](filepath, conn)
-            except Exception as e:
-                logger.error(f"Failed to process file {filename} for purpose {purpose}: {e}")
-    else:
-        logger.warning(f"No processing function defined for the purpose: '{purpose}'.")
+        return [ingest_file(filepath, purpose, conn) for filepath in list_files_for_purpose(directory, purpose)]
+    logger.warning(f"No processing function defined for the purpose: '{purpose}'.")
+    return []
+
+# Connection owned by each ingestion worker process, opened once by _init_ingest_worker
+_worker_conn = None
+
+def _init_ingest_worker(password):
+    global _worker_conn
+    _worker_conn = connect_to_database(password)
+
+def _ingest_file_in_worker(filepath, purpose):
+    if _worker_conn is None:
+        return {"file": filepath, "purpose": purpose, "status": "Failed", "error": "No DB connection in worker"}
+    return ingest_file(filepath, purpose, _worker_conn)
 
 def load_characteristics(filepath, conn):
     logger.info(f"Loading characteristics data from {filepath}")
@@ -106,178 +357,361 @@ def load_characteristics(filepath, conn):
         material_id, vendor, _, _ = extract_ids_from_filename(base_name)  # No part type or part ID for characteristics
         logger.info(f"Extracted IDs - Material ID: {material_id}, Vendor: {vendor}")
 
-        insert_material_if_not_exists(conn, material_id, vendor)
+        ensure_dimensions(conn, material_id, vendor)
         data_type = 'TGA' if "TGA" in filepath.upper() else 'DSC' if "DSC" in filepath.upper() else None
         if data_type:
-            load_thermal_data(filepath, conn, material_id, data_type)
-        else:
-            logger.info(f"File {filepath} does not match expected data types for processing.")
+            return load_thermal_data(filepath, conn, material_id, data_type)
+        logger.info(f"File {filepath} does not match expected data types for processing.")
+        return 0
     except Exception as e:
         logger.error(f"Error loading characteristics data from {filepath}: {e}")
+        raise
 
-def process_files_in_directory(directory_config, conn):
+def collect_ingest_tasks(directory_config):
     """
-    Process files in directories based on their purpose.
+    Returns the (filepath, purpose) pairs to load for a purpose -> directory mapping.
     """
+    tasks = []
     for purpose, directory in directory_config.items():
-        if os.path.isdir(directory):
-            logger.info(f"Processing files in directory: {directory} for purpose: {purpose}")
-            process_data_for_purpose(directory, purpose, conn)
-        else:
+        if not directory or not os.path.isdir(directory):
             logger.warning(f"Invalid or non-existent directory path: {directory} for purpose: {purpose}")
+        elif purpose not in PURPOSE_MAPPING:
+            logger.warning(f"No processing function defined for the purpose: '{purpose}'.")
+        else:
+            logger.info(f"Processing files in directory: {directory} for purpose: {purpose}")
+            tasks.extend((filepath, purpose) for filepath in list_files_for_purpose(directory, purpose))
+    return tasks
 
+def ingest_tasks(tasks, conn, password=None, workers=INGEST_WORKERS, on_file_done=None, cancel_event=None):
+    """
+    Loads (filepath, purpose) pairs and returns one result dictionary per file that was attempted.
+    When a password is given and workers > 1, files are spread across a pool of worker processes,
+    each with its own database connection, and conn is not used; otherwise they are loaded one by one on conn.
+    on_file_done is called with each result as it arrives. Setting cancel_event stops
+    further files from starting; files already being loaded run to completion.
+    """
+    results = []
+
+    def record(result):
+        results.append(result)
+        if on_file_done:
+            on_file_done(result)
+
+    if password is None or workers <= 1 or len(tasks) <= 1:
+        for filepath, purpose in tasks:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("Ingestion cancelled before file: %s", filepath)
+                break
+            record(ingest_file(filepath, purpose, conn))
+        return results
+
+    logger.info(f"Ingesting {len(tasks)} files with {workers} worker processes.")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(INGEST_START_METHOD),
+                             initializer=_init_ingest_worker, initargs=(password,)) as executor:
+        futures = {executor.submit(_ingest_file_in_worker, filepath, purpose): (filepath, purpose) for filepath, purpose in tasks}
+        for future in as_completed(futures):
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+            if future.cancelled():
+                continue
+            filepath, purpose = futures[future]
+            try:
+                record(future.result())
+            except Exception as e:  # Worker process died
+                logger.error(f"Worker failed on file {filepath}: {e}")
+                record({"file": filepath, "purpose": purpose, "status": "Failed", "error": str(e)})
+    return results
+
+def process_files_in_directory(directory_config, conn, password=None, workers=INGEST_WORKERS):
+    """
+    Process files in directories based on their purpose.
+    Returns one result dictionary per file.
+    """
+    return ingest_tasks(collect_ingest_tasks(directory_config), conn, password, workers)
+
+def sniff_live_print_dialect(header_line):
+    return csv.Sniffer().sniff(header_line, delimiters=',;\t')
+
+def iter_live_print_blocks(lines, delimiter, names, report, block_size=SAMPLE_BLOCK_SIZE):
+    """
+    Parses live print lines (time stamp first, then one column per characteristic in names) into
+    (names, time stamp, (n, k) values) blocks for iter_long_samples. Lines too short to hold every column, such as
+    one still being written, and cells that are not numbers, such as a repeated header, are counted in report and
+    dropped by validation instead of failing the batch they arrived in.
+    """
+    usecols = range(len(names) + 1)
+    for block_lines in iter_line_blocks(iter(lines), block_size):
+        with stage('parse'):
+            block = parse_numeric_block(block_lines, delimiter, usecols, report)
+        yield names, block[:, 0], block[:, 1:]
+
+def write_live_print_samples(conn, long_blocks, part_id, column_ids, summary):
+    """
+    Writes long live print blocks from iter_long_samples and folds them into summary. Returns the rows written.
+    """
+    row_count = 0
+    for _, time_stamps, positions, samples in long_blocks:
+        ids = column_ids[positions]
+        with stage('parse'):
+            summary.update(ids, samples)
+        with stage('write'):
+            row_count += bulk_write_columns(
+                conn,
+                'filamentquality.live_print_data',
+                ('part_id', 'time_stamp', 'characteristic_id', 'characteristic_value'),
+                (part_id, time_stamps, ids, samples)
+            )
+    return row_count
 
 def load_live_print_data(filepath, conn):
+    """
+    Loads a complete live print CSV in one pass, parsing the next blocks on a pipeline thread while the current
+    one is written. Files that are still being written are followed by live_ingest instead.
+    Returns the number of rows written and the RejectReport.
+    """
+    material_id, vendor, part_type, part_id = extract_ids_from_filename(os.path.basename(filepath))
+    ensure_dimensions(conn, material_id, vendor, part_id, part_type)
     logger.info(f"Loading live print data from: {filepath}")
-    # Placeholder for actual loading logic
-    pass
+    try:
+        with open(filepath, 'r', newline='') as csvfile:
+            header_line = csvfile.readline()
+            dialect = sniff_live_print_dialect(header_line)
+            column_names = next(csv.reader([header_line], dialect))
+            names = column_names[1:]
+            characteristic_ids = resolve_characteristic_ids(conn, names)
+            column_ids = np.array([characteristic_ids[name] for name in names], dtype=np.int64)
+
+            report = RejectReport()
+            summary = SummaryStats()
+            blocks = iter_long_samples(iter_live_print_blocks(csvfile, dialect.delimiter, names, report), report)
+            row_count = write_live_print_samples(conn, pipelined(blocks), part_id, column_ids, summary)
+            with stage('write'):
+                summary.write(conn, 'live_print_data', part_id)
+        if report.total:
+            logger.warning("Rejected %d live print samples from %s: %s", report.total, filepath, report)
+        logger.info(f"Successfully loaded {row_count} live print rows for part ID: {part_id}")
+        return row_count, report
+    except Exception as e:
+        logger.error(f"Failed to load live print data from {filepath}: {e}")
+        raise
 
 def load_thermal_data(file_path, conn, material_id, data_type):
     try:
         logger.info(f"Attempting to load {data_type.upper()} data from file: {file_path}")
-        _, vendor, _, _ = extract_ids_from_filename(os.path.basename(file_path))  # Re-extract vendor to ensure it's not missed
-        logger.info(f"Vendor for {material_id} is identified as {vendor}")
-
-        xls = pd.ExcelFile(file_path)
-        # Ensuring the material is in the database before attempting to insert DSC data
-        insert_material_if_not_exists(conn, material_id, vendor)
-
-        for sheet_index in range(1, len(xls.sheet_names)):  # Start from 1 to skip any summary sheet if present
-            sheet_name = xls.sheet_names[sheet_index]
-            headers = pd.read_excel(file_path, sheet_name=sheet_name, nrows=3, header=None)
-            combined_headers = headers.iloc[1] + ' ' + headers.iloc[2].fillna('')
-            combined_headers = combined_headers.str.replace(r'\s*\([^)]*\)', '', regex=True).str.strip()
-            df = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=3, names=combined_headers)
-
-            dsc_ramp = headers.iloc[0, 0] if headers.shape[1] > 0 else "Unknown Ramp"
-            logger.info(f"Processing sheet '{sheet_name}' with DSC ramp: {dsc_ramp}")
-
-            sql_insert = """
-                INSERT INTO filamentquality.material_thermal_characteristics
-                (material_id, dsc_ramp, time_min, temperature, heat_flow)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            with conn.cursor() as cursor:
-                for index, row in df.iterrows():
-                    cursor.execute(sql_insert, (
-                        material_id,
-                        dsc_ramp,
-                        row['Time min'],
-                        row['Temperature °C'],
-                        row['Heat Flow W/g']
-                    ))
-                    logger.info(f"Inserted: Material ID {material_id}, Ramp {dsc_ramp}, Time {row['Time min']}")
-            conn.commit()
-            logger.info(f"Successfully loaded data from sheet '{sheet_name}'.")
+        # load_characteristics has already ensured the material within this transaction
+        total_rows = 0
+        extract = data_type.upper() == 'DSC'
+        # Sheets are read, parsed and analysed ahead of the writes; the wait for the next sheet is charged to parse
+        sheets = (
+            (sheet, extract_ramp_features(sheet.time_min, sheet.temperature, sheet.heat_flow) if extract else None)
+            for sheet in read_thermal_workbook(file_path)
+        )
+        for sheet, features in timed_iter('parse', pipelined(sheets)):
+            logger.info(f"Processing sheet '{sheet.name}' with DSC ramp: {sheet.dsc_ramp}")
+            with stage('write'):
+                sheet_rows = bulk_write_columns(
+                    conn,
+                    'filamentquality.material_thermal_characteristics',
+                    ('material_id', 'dsc_ramp', 'time_min', 'temperature', 'heat_flow'),
+                    (material_id, sheet.dsc_ramp, sheet.time_min, sheet.temperature, sheet.heat_flow)
+                )
+                write_ramp_features(conn, material_id, sheet.dsc_ramp, features)
+            total_rows += sheet_rows
+            if sheet.skipped_rows:
+                logger.warning(f"Skipped {sheet.skipped_rows} non-numeric rows in sheet '{sheet.name}'.")
+            logger.info(f"Wrote {sheet_rows} rows from sheet '{sheet.name}'.")
+
+        logger.info(f"Successfully loaded {total_rows} {data_type.upper()} rows for material ID {material_id}.")
+        return total_rows
 
     except Exception as e:
-        conn.rollback()
         logger.error(f"Exception during loading {data_type.upper()} data: {e}")
+        raise
 
 
-def check_data_before_insert(conn, material_id, dsc_ramp, time_min):
-    """ Checks if the data already exists to avoid duplicate entry errors. """
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT 1 FROM filamentquality.material_thermal_characteristics WHERE material_id = %s AND dsc_ramp = %s AND time_min = %s",
-                (material_id, dsc_ramp, time_min)
-            )
-            exists = cursor.fetchone() is not None
-            if exists:
-                logger.debug(f"Data already exists for Material ID: {material_id}, Ramp: {dsc_ramp}, Time Min: {time_min}")
-            return exists
-    except Exception as e:
-        logger.error(f"Error checking for existing data: {e}")
-        return False
+def read_pressure_header(file):
+    """
+    Advances a text pressure log past the second ***End_of_Header*** marker and returns the column names on the line after it.
+    Reads line by line so the header search never holds more than one line in memory.
+    Returns None if the file ends before the data section is found.
+    """
+    header_count = 0
+    for line in iter(file.readline, ''):
+        if line.strip() == '***End_of_Header***':
+            header_count += 1
+            if header_count == 2:
+                # Column names: X_Value, Temp (C), Pressure, Flow SLPM (Filtered)
+                return [name.strip() for name in file.readline().rstrip('\r\n').split('\t')]
+    return None
+
+def _configured_channels(available, file_path):
+    names = [name for name in PRESSURE_CHANNELS if name in available]
+    if not names:
+        raise ValueError(f"None of the channels {', '.join(PRESSURE_CHANNELS)} found in {file_path}")
+    return names
+
+def iter_pressure_blocks(file_path, report, block_size=SAMPLE_BLOCK_SIZE):
+    """
+    Yields (channel names, elapsed time, (n, channels) values) blocks holding every configured PRESSURE_CHANNELS
+    channel present in a Parts Quality file, so all of them are loaded in a single pass.
+    Binary TDMS files are recognised by their magic bytes and read through a memory map, decoding only
+    the block_size range of the configured channels each block needs; LabVIEW text logs are parsed block by block.
+    """
+    if is_tdms_file(file_path):
+        with TdmsFile(file_path) as tdms:
+            names = _configured_channels([channel.name for channel in tdms.channels], file_path)
+            channels = [tdms.channel(name) for name in names]
+            time_channel = tdms.channel(PRESSURE_TIME_CHANNEL)
+            length = min(len(channel) for channel in channels)
+            if time_channel is not None:
+                length = min(length, len(time_channel))
+            for start in range(0, length, block_size):
+                stop = min(start + block_size, length)
+                with stage('read'):
+                    values = np.column_stack([channel.read(start, stop) for channel in channels]).astype(np.float64)
+                    if time_channel is not None:
+                        axis = np.array(time_channel.read(start, stop), dtype=np.float64)
+                    else:
+                        axis = channels[0].time_track(start, stop)
+                yield names, axis, values
+        return
+
+    with open(file_path, 'r') as file:
+        column_names = read_pressure_header(file)
+        if column_names is None:
+            raise ValueError("End of header not found in pressure data file")
+        names = _configured_channels(column_names, file_path)
+        usecols = [0] + [column_names.index(name) for name in names]  # Elapsed time is the first column
+        for lines in timed_iter('read', iter_line_blocks(file, block_size)):
+            with stage('parse'):
+                block = parse_numeric_block(lines, '\t', usecols, report)
+            yield names, block[:, 0], block[:, 1:]
+
+def iter_long_samples(blocks, report):
+    """
+    Validates (names, axis, (n, k) values) blocks and melts them to long (names, axis, column positions, values)
+    blocks. Positions index names and are mapped to characteristic IDs by the caller, so this can run on a
+    pipeline thread without touching the database connection.
+    """
+    for names, axis, values in blocks:
+        with stage('parse'):
+            keep = validate_samples(axis, values, names, report)
+            long_block = wide_to_long(axis, values, range(len(names)), keep)
+        yield (names,) + long_block
 
 def load_pressure(file_path, conn):
+    """
+    Loads every configured channel of a Parts Quality file (binary TDMS or text log) in one pass, block by block.
+    Each block is validated in bulk and melted to long rows; rejected samples are counted instead of failing the file.
+    Reading, parsing and validation run on a pipeline thread up to PIPELINE_DEPTH blocks ahead of the COPY writes.
+    Returns the number of rows written and the RejectReport.
+    """
     material_id, vendor, part_type, part_id = extract_ids_from_filename(os.path.basename(file_path))
-    insert_material_if_not_exists(conn, material_id, vendor)
-    insert_part_if_applicable(conn, part_id, material_id, vendor, part_type)
+    ensure_dimensions(conn, material_id, vendor, part_id, part_type)
 
     logger.info("Starting to load pressure data from: %s", file_path)
     try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            column_names = ["X_Value", "Temp (C)", "Pressure", "Flow SLPM (Filtered)"]
-            sql_insert = 'INSERT INTO filamentquality.part_characteristics (part_id, time_elapsed, characteristic_name, characteristic_value) VALUES (%s, %s, %s, %s)'
-
-            header_count, data_start_index = 0, None
-            for i, line in enumerate(lines):
-                if line.strip() == '***End_of_Header***':
-                    header_count += 1
-                    if header_count == 2:
-                        data_start_index = i + 2
-                        break
-
-            if data_start_index is None:
-                logger.error("Failed to find the end of header in pressure data file: %s", file_path)
-                return
-
-            with conn.cursor() as cursor:
-                for line in lines[data_start_index:]:
-                    values = line.strip().split('\t')
-                    cursor.execute(sql_insert, (part_id, values[0], "Pressure", values[2]))
-                    logger.info("Inserted pressure data for part ID %s: %s, Pressure, %s", part_id, values[0], values[2])
-
-        conn.commit()
-        logger.info("Successfully loaded pressure data for part ID: %s", part_id)
+        report = RejectReport()
+        row_count = 0
+        column_ids = None
+        archive = open_series_archive(conn, 'part_characteristics', part_id)
+        summary = SummaryStats()
+        blocks = iter_long_samples(iter_pressure_blocks(file_path, report), report)
+        for names, times, positions, samples in pipelined(blocks):
+            if column_ids is None:
+                characteristic_ids = resolve_characteristic_ids(conn, names)
+                column_ids = np.array([characteristic_ids[name] for name in names], dtype=np.int64)
+            ids = column_ids[positions]
+            with stage('parse'):
+                summary.update(ids, samples)
+            with stage('write'):
+                row_count += write_sample_block(conn, 'part_characteristics', 'time_elapsed', part_id,
+                                                times, ids, samples, archive)
+        with stage('write'):
+            if archive is not None:
+                archive.close()
+            summary.write(conn, 'part_characteristics', part_id)
+
+        if report.total:
+            logger.warning("Rejected %d pressure samples from %s: %s", report.total, file_path, report)
+        logger.info("Successfully loaded %d pressure rows for part ID: %s", row_count, part_id)
+        return row_count, report
     except Exception as e:
-        conn.rollback()
         logger.error("Failed to load pressure data from %s: %s", file_path, e)
+        raise
 
 def load_diameter(file_path, conn):
+    """
+    Loads a wide diameter CSV (one column per characteristic, position last) into long rows, block by block,
+    parsing the next blocks on a pipeline thread while the current one is written.
+    Returns the number of rows written and the RejectReport.
+    """
     material_id, vendor, part_type, part_id = extract_ids_from_filename(os.path.basename(file_path))
-    insert_material_if_not_exists(conn, material_id, vendor)
-    insert_part_if_applicable(conn, part_id, material_id, vendor, part_type)
+    ensure_dimensions(conn, material_id, vendor, part_id, part_type)
     logger.info("Starting to load diameter data from: %s", file_path)
     try:
         with open(file_path, 'r') as csvfile:
             dialect = csv.Sniffer().sniff(csvfile.read(1024))
             csvfile.seek(0)
-            reader = csv.reader(csvfile, dialect)
-            column_names = next(reader)
-
-            sql_insert = ('INSERT INTO filamentquality.benchtop_filament_diameter '
-                          '(part_id, position, characteristic_name, characteristic_value) '
-                          'VALUES (%s, %s, %s, %s)')
-
-            with conn.cursor() as cursor:
-                for values in reader:
-                    if len(values) < len(column_names):
-                        logger.warning("Mismatched column count in line, skipping.")
-                        continue
-                    distance_m = values[-1]  # Assuming the last value is the distance/position
-                    for i, value in enumerate(values[:-1]):  # Exclude the last value (distance_m) from iteration
-                        characteristic_name = column_names[i]  # Use the column name corresponding to the index
-                        cursor.execute(sql_insert, (part_id, distance_m, characteristic_name, value))
-                        logger.info("Inserted diameter data for part ID %s at position %s: %s, %s", part_id, distance_m, characteristic_name, value)
-
-            conn.commit()
-            logger.info("Successfully loaded diameter data for part ID: %s", part_id)
+            column_names = next(csv.reader([csvfile.readline()], dialect))
+            characteristic_names = column_names[:-1]  # The last column is the distance/position
+            characteristic_ids = resolve_characteristic_ids(conn, characteristic_names)
+            column_ids = np.array([characteristic_ids[name] for name in characteristic_names], dtype=np.int64)
+
+            report = RejectReport()
+            row_count = 0
+            archive = open_series_archive(conn, 'benchtop_filament_diameter', part_id)
+            summary = SummaryStats()
+
+            def blocks():
+                for lines in timed_iter('read', iter_line_blocks(csvfile, SAMPLE_BLOCK_SIZE)):
+                    with stage('parse'):
+                        block = parse_numeric_block(lines, dialect.delimiter, range(len(column_names)), report)
+                    yield characteristic_names, block[:, -1], block[:, :-1]
+
+            for _, positions, columns, samples in pipelined(iter_long_samples(blocks(), report)):
+                ids = column_ids[columns]
+                with stage('parse'):
+                    summary.update(ids, samples)
+                with stage('write'):
+                    row_count += write_sample_block(conn, 'benchtop_filament_diameter', 'position', part_id,
+                                                    positions, ids, samples, archive)
+            with stage('write'):
+                if archive is not None:
+                    archive.close()
+                summary.write(conn, 'benchtop_filament_diameter', part_id)
+
+            if report.total:
+                logger.warning("Rejected %d diameter samples from %s: %s", report.total, file_path, report)
+            logger.info("Successfully loaded %d diameter rows for part ID: %s", row_count, part_id)
+            return row_count, report
     except Exception as e:
-        conn.rollback()
         logger.error("Failed to load diameter data from %s: %s", file_path, e)
+        raise
 
 
 # Mapping of purposes to their configurations
 PURPOSE_MAPPING = {
     "Parts Quality": {
         "extensions": ['.tdms'],
-        "loader": load_pressure
+        "loader": load_pressure,
+        "part_data": True  # Rows are keyed by a part ID
     },
     "BenchTop Filament Diameter": {
         "extensions": ['.csv'],
-        "loader": load_diameter
+        "loader": load_diameter,
+        "part_data": True  # Rows are keyed by a part ID
     },
     "Characteristics": {
         "extensions": ['.xls', '.xlsx'],
-        "loader": load_characteristics
+        "loader": load_characteristics,
+        "part_data": False
     },
     "Live Print Data": {
         "extensions": ['.csv'],
-        "loader": load_live_print_data
+        "loader": load_live_print_data,
+        "part_data": True  # Rows are keyed by a part ID
     }
 }
 
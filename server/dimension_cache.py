@@ -0,0 +1,99 @@
+import threading
+
+
+class DimensionCache:
+    """
+    Material and part keys known to exist in the database, shared by every loader in the process so a file whose
+    material and part are already stored costs no upsert round trip. Warmed with all keys of the materials and
+    parts tables on first use. Keys missing from the cache are upserted together in one round trip inside the
+    caller's transaction and stay pending for that connection: commit() promotes them once the transaction has
+    committed and rollback() forgets them, so a rolled-back file never leaves a key cached that is not stored.
+    """
+    def __init__(self):
+        self._materials = set()
+        self._parts = set()
+        self._warm = False
+        self._pending = {}  # connection -> (material IDs, part IDs) upserted in its open transaction
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.upserts = 0
+
+    def ensure(self, conn, material_id, vendor, part_id=None, part_type=None):
+        """
+        Makes sure the material, and the part when part_id is given, exist within conn's transaction.
+        Returns the keys that had to be upserted as (material IDs, part IDs).
+        """
+        if not self._warm:
+            self.warm(conn)
+        with self._lock:
+            pending_materials, pending_parts = self._pending.get(conn, (set(), set()))
+            new_material = material_id not in self._materials and material_id not in pending_materials
+            new_part = part_id is not None and part_id not in self._parts and part_id not in pending_parts
+            if not new_material and not new_part:
+                self.hits += 1
+                return (), ()
+
+        statements, params = [], []
+        if new_material:
+            statements.append("INSERT INTO filamentquality.materials (material_id, vendor) VALUES (%s, %s) "
+                              "ON CONFLICT (material_id) DO NOTHING")
+            params.extend((material_id, vendor))
+        if new_part:
+            statements.append("INSERT INTO filamentquality.parts (part_id, material_id, part_type) VALUES (%s, %s, %s) "
+                              "ON CONFLICT (part_id) DO NOTHING")
+            params.extend((part_id, material_id, part_type))
+        with conn.cursor() as cursor:
+            cursor.execute("; ".join(statements), params)  # Both upserts in a single round trip
+
+        materials = (material_id,) if new_material else ()
+        parts = (part_id,) if new_part else ()
+        with self._lock:
+            pending_materials, pending_parts = self._pending.setdefault(conn, (set(), set()))
+            pending_materials.update(materials)
+            pending_parts.update(parts)
+            self.upserts += 1
+        return materials, parts
+
+    def warm(self, conn):
+        """Loads every stored material and part key. Reads within conn's transaction without committing it."""
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT material_id FROM filamentquality.materials")
+            materials = {row[0] for row in cursor.fetchall()}
+            cursor.execute("SELECT part_id FROM filamentquality.parts")
+            parts = {row[0] for row in cursor.fetchall()}
+        with self._lock:
+            self._materials.update(materials)
+            self._parts.update(parts)
+            self._warm = True
+
+    def commit(self, conn):
+        """Promotes the keys conn upserted to known keys; call after its transaction committed."""
+        with self._lock:
+            materials, parts = self._pending.pop(conn, ((), ()))
+            self._materials.update(materials)
+            self._parts.update(parts)
+
+    def rollback(self, conn):
+        with self._lock:
+            self._pending.pop(conn, None)
+
+    def clear(self):
+        """Forgets all keys, e.g. after rows were deleted behind the cache's back; the next use warms it again."""
+        with self._lock:
+            self._materials.clear()
+            self._parts.clear()
+            self._pending.clear()
+            self._warm = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "materials": len(self._materials),
+                "parts": len(self._parts),
+                "pending_transactions": len(self._pending),
+                "hits": self.hits,
+                "upserts": self.upserts,
+            }
+
+
+dimensions = DimensionCache()
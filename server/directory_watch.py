@@ -0,0 +1,266 @@
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+import logging
+from database_operations import PURPOSE_MAPPING
+from metrics import metrics, log_rate_limited
+
+logger = logging.getLogger(__name__)
+
+# Seconds a file must go without change events before it is queued for loading
+WATCH_SETTLE_DELAY = 2.0
+# Seconds the watch thread waits for events before checking for settled files and stop requests
+WATCH_POLL_INTERVAL = 0.5
+# Bytes read from the inotify descriptor at once; holds hundreds of events
+WATCH_READ_SIZE = 64 * 1024
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+# Events subscribed to on every watched directory
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# struct inotify_event without its variable-length name: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """
+    Minimal ctypes binding of Linux inotify: adds and removes directory watches and reads decoded events.
+    """
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("Directory watching needs Linux inotify")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._libc.inotify_init1.argtypes = (ctypes.c_int,)
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """Returns the watch descriptor; watching a directory twice returns the same one."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def remove_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)  # Fails harmlessly for a watch the kernel already dropped
+
+    def read_events(self, timeout):
+        """Waits up to timeout seconds and returns the events that arrived as (watch descriptor, mask, name)."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, WATCH_READ_SIZE)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            events.append((wd, mask, os.fsdecode(data[offset:offset + length].rstrip(b'\0'))))
+            offset += length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    Watches purpose directories and all their subdirectories for files written by instruments, and hands each
+    file to its purpose's loader once no change event has arrived for settle_delay seconds. The trees are walked
+    once when the watch starts (loading files added while it was off) and again only after the kernel's event
+    queue overflowed; otherwise only the changed paths are looked at. Settled files are loaded as upload jobs,
+    one job at a time, and the ingest manifest skips any that did not really change.
+    """
+    def __init__(self, directory_config, pool, password, job_manager, settle_delay=WATCH_SETTLE_DELAY):
+        self.roots = {}
+        for purpose, directory in directory_config.items():
+            if purpose not in PURPOSE_MAPPING:
+                raise ValueError(f"No processing function defined for the purpose: '{purpose}'")
+            if not directory or not os.path.isdir(directory):
+                raise ValueError(f"Not a directory: {directory}")
+            self.roots[os.path.realpath(directory)] = purpose
+        self.directory_config = directory_config
+        self.pool = pool
+        self.password = password
+        self.job_manager = job_manager
+        self.settle_delay = settle_delay
+        self.files_queued = 0
+        self.jobs_submitted = 0
+        self.overflows = 0
+        self.error = None
+        self._inotify = Inotify()
+        self._watches = {}  # Watch descriptor -> (directory, purpose)
+        self._pending = {}  # File path -> (purpose, monotonic time of its last event)
+        self._job = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="directory-watch", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=WATCH_POLL_INTERVAL * 10)
+
+    def stats(self):
+        job = self._job
+        return {
+            "directories": self.directory_config,
+            "running": self._thread.is_alive(),
+            "watched_directories": len(self._watches),
+            "pending_files": len(self._pending),
+            "files_queued": self.files_queued,
+            "jobs_submitted": self.jobs_submitted,
+            "current_job_id": job.job_id if job is not None and not job.finished else None,
+            "overflows": self.overflows,
+            "error": self.error,
+        }
+
+    def _run(self):
+        try:
+            self._add_all_trees()
+            while not self._stop_event.is_set():
+                for wd, mask, name in self._inotify.read_events(WATCH_POLL_INTERVAL):
+                    self._handle_event(wd, mask, name)
+                self._submit_settled()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Directory watch stopped: {e}")
+        finally:
+            self._inotify.close()
+
+    def _add_all_trees(self):
+        for root, purpose in self.roots.items():
+            self._add_tree(root, purpose)
+
+    def _add_tree(self, directory, purpose):
+        """
+        Watches directory and its subdirectories and queues the files already in them. Each directory is watched
+        before it is listed, so a file created in between is seen either in the listing or as an event.
+        Subdirectories that are themselves watched for another purpose are left to that purpose.
+        """
+        now = time.monotonic()
+        stack = [directory]
+        while stack:
+            path = stack.pop()
+            try:
+                wd = self._inotify.add_watch(path)
+                entries = list(os.scandir(path))
+            except OSError as e:  # Removed again before it could be watched, unreadable, or out of watches
+                log_rate_limited(logger, logging.WARNING, "watch-add-failed", "Cannot watch %s: %s", path, e)
+                continue
+            self._watches[wd] = (path, purpose)
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self.roots:
+                        stack.append(entry.path)
+                elif self._matches(entry.name, purpose):
+                    self._pending[entry.path] = (purpose, now)
+
+    @staticmethod
+    def _matches(filename, purpose):
+        return any(filename.endswith(ext) for ext in PURPOSE_MAPPING[purpose]['extensions'])
+
+    def _handle_event(self, wd, mask, name):
+        metrics.increment("watch.events")
+        if mask & IN_Q_OVERFLOW:
+            self.overflows += 1
+            metrics.increment("watch.overflows")
+            logger.warning("Directory watch event queue overflowed; rescanning the watched directories.")
+            self._add_all_trees()
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)  # Directory deleted or moved away
+            return
+        watched = self._watches.get(wd)
+        if watched is None:
+            return
+        directory, purpose = watched
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            if directory in self.roots:
+                logger.warning(f"Watched directory {directory} was removed or moved.")
+            return
+
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and path not in self.roots:
+                self._add_tree(path, purpose)
+        elif not self._matches(name, purpose):
+            return
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._pending.pop(path, None)
+        else:
+            self._pending[path] = (purpose, time.monotonic())
+
+    def _submit_settled(self):
+        """Starts an upload job for the files that have settled, unless the previous one is still running."""
+        if not self._pending or (self._job is not None and not self._job.finished):
+            return
+        now = time.monotonic()
+        settled = [path for path, (_, last_event) in self._pending.items() if now - last_event >= self.settle_delay]
+        if not settled:
+            return
+        tasks = [(path, self._pending.pop(path)[0]) for path in settled]
+        tasks = [(path, purpose) for path, purpose in tasks if os.path.isfile(path)]
+        if not tasks:
+            return
+        self._job = self.job_manager.submit(self.pool, self.directory_config, self.password, tasks=tasks)
+        self.files_queued += len(tasks)
+        self.jobs_submitted += 1
+        metrics.increment("watch.files_queued", len(tasks))
+        logger.info(f"Directory watch queued {len(tasks)} settled files as upload job {self._job.job_id}.")
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def start_watch(directory_config, pool, password, job_manager):
+    """Starts watching the purpose directories, replacing the watch that was running."""
+    global _watcher
+    watcher = DirectoryWatcher(directory_config, pool, password, job_manager)
+    with _watcher_lock:
+        previous, _watcher = _watcher, watcher
+    if previous:
+        previous.stop()
+    watcher.start()
+    logger.info(f"Directory watch started for {', '.join(watcher.roots)}.")
+    return watcher
+
+def stop_watch():
+    global _watcher
+    with _watcher_lock:
+        watcher, _watcher = _watcher, None
+    if watcher:
+        watcher.stop()
+        logger.info("Directory watch stopped.")
+    return watcher
+
+def watch_status():
+    with _watcher_lock:
+        watcher = _watcher
+    return watcher.stats() if watcher else None
@@ -0,0 +1,230 @@
+import numpy as np
+
+# Heat flow sign convention of the instrument exports: True when exothermic events point up (TA Instruments default)
+DSC_EXO_UP = True
+# Points in the moving average applied before differentiating, as a fraction of the ramp and at least 5
+DSC_SMOOTHING_FRACTION = 0.005
+# Fraction of a ramp's points at each end left out of event detection, covering the start-up and end transients
+DSC_TRANSIENT_FRACTION = 0.05
+# A thermal event is where the slope of the smoothed signal departs from the baseline slope by this many noise
+# levels of the slope; the event extends outward until the departure changes sign
+DSC_EVENT_MIN_SNR = 5.0
+# A peak must rise this many noise levels above its local baseline to be reported
+DSC_PEAK_MIN_SNR = 10.0
+# A glass transition step must be this many noise levels high to be reported
+DSC_STEP_MIN_SNR = 5.0
+# Ramps with fewer points are stored without features
+DSC_MIN_POINTS = 50
+
+# Columns of dsc_ramp_features filled from RampFeatures, in insert order
+FEATURE_COLUMNS = ('ramp_direction', 'heating_rate', 'temperature_min', 'temperature_max', 'sample_count',
+                   'glass_transition_temperature', 'peak_type', 'onset_temperature', 'peak_temperature',
+                   'peak_heat_flow', 'enthalpy')
+
+
+class RampFeatures:
+    """
+    Thermal events found in one DSC ramp. Temperatures are in °C, the heating rate in °C/min (negative when
+    cooling), the peak height in W/g above the baseline and the enthalpy of the peak in J/g. Features that
+    could not be found are None.
+    """
+    def __init__(self, ramp_direction, heating_rate, temperature_min, temperature_max, sample_count):
+        self.ramp_direction = ramp_direction
+        self.heating_rate = heating_rate
+        self.temperature_min = temperature_min
+        self.temperature_max = temperature_max
+        self.sample_count = sample_count
+        self.glass_transition_temperature = None
+        self.peak_type = None
+        self.onset_temperature = None
+        self.peak_temperature = None
+        self.peak_heat_flow = None
+        self.enthalpy = None
+
+    def as_row(self):
+        return tuple(getattr(self, column) for column in FEATURE_COLUMNS)
+
+
+def _moving_average(values, window):
+    if window < 2:
+        return values
+    kernel = np.ones(window) / window
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode='edge')
+    return np.convolve(padded, kernel, mode='valid')
+
+def _trapezoid(y, x):
+    return float(np.sum((y[1:] + y[:-1]) * np.diff(x)) / 2)
+
+def _interp(x, xp, fp):
+    """np.interp for xp in either direction."""
+    if xp[-1] < xp[0]:
+        xp, fp = xp[::-1], fp[::-1]
+    return float(np.interp(x, xp, fp))
+
+def _robust_std(values):
+    return 1.4826 * float(np.median(np.abs(values - np.median(values))))
+
+def _find_events(deviation, threshold, max_gap):
+    """
+    Splits the slope deviation into runs of one sign and returns the events as (start, stop, signs): runs that
+    cross threshold somewhere, with runs less than max_gap points apart merged into one event. A peak shows up as
+    a rising and a falling run next to each other, a step as a single run.
+    """
+    signs = np.sign(deviation)
+    bounds = np.r_[0, np.flatnonzero(np.diff(signs)) + 1, len(deviation)]
+    events = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        sign = int(signs[start])
+        if sign == 0 or np.max(np.abs(deviation[start:stop])) < threshold:
+            continue
+        if events and start - events[-1][1] <= max_gap:
+            events[-1] = (events[-1][0], stop, events[-1][2] | {sign})
+        else:
+            events.append((start, stop, {sign}))
+    return events
+
+
+def extract_ramp_features(time_min, temperature, heat_flow):
+    """
+    Finds the main melting or crystallisation peak and the glass transition of one ramp, vectorized over its
+    samples. Thermal events are located on the slope of the smoothed signal against time: where it departs from
+    the ramp's baseline slope by DSC_EVENT_MIN_SNR noise levels, out to where the departure changes sign. Events
+    whose slope rises and falls are peaks, measured against a straight baseline between their own limits so a
+    preceding step does not distort them; events with a one-signed slope are steps.
+    The main peak is the largest one clearing DSC_PEAK_MIN_SNR times the noise, with its extrapolated onset
+    (steepest tangent of the leading edge meeting the baseline) and its area as enthalpy. The glass transition is
+    the inflection point of the largest step before the main peak, reported on heating ramps only.
+    Returns a RampFeatures, or None for ramps too short to analyse.
+    """
+    order = np.argsort(time_min, kind='stable')
+    t, temp, flow = time_min[order], temperature[order], heat_flow[order]
+    finite = np.isfinite(t) & np.isfinite(temp) & np.isfinite(flow)
+    t, temp, flow = t[finite], temp[finite], flow[finite]
+    n = len(t)
+    if n < DSC_MIN_POINTS or t[-1] <= t[0]:
+        return None
+
+    heating_rate = float(np.polyfit(t, temp, 1)[0])
+    features = RampFeatures('heating' if heating_rate >= 0 else 'cooling', heating_rate,
+                            float(temp.min()), float(temp.max()), n)
+
+    window = max(5, int(n * DSC_SMOOTHING_FRACTION))
+    smoothed = _moving_average(flow, window)
+    noise = max(_robust_std(flow - smoothed), 1e-12)
+    slope = _moving_average(np.gradient(smoothed, t), window)
+    trim = min(max(window, int(n * DSC_TRANSIENT_FRACTION)), n // 4)
+    inner = slice(trim, n - trim)
+    baseline_slope = float(np.median(slope[inner]))
+    deviation = np.zeros(n)
+    deviation[inner] = slope[inner] - baseline_slope
+    slope_noise = max(_robust_std(deviation[inner]), 1e-9 * float(np.max(np.abs(deviation))), 1e-12)
+
+    peak, steps = None, []
+    for start, stop, signs in _find_events(deviation, DSC_EVENT_MIN_SNR * slope_noise, window):
+        stop = min(stop, n - 1)
+        if len(signs) == 1:
+            steps.append((start, stop))
+            continue
+        span = slice(start, stop + 1)
+        baseline = smoothed[start] + (smoothed[stop] - smoothed[start]) * (t[span] - t[start]) / (t[stop] - t[start])
+        excursion = smoothed[span] - baseline
+        apex = int(np.argmax(np.abs(excursion)))
+        height = float(excursion[apex])
+        if abs(height) >= DSC_PEAK_MIN_SNR * noise and (peak is None or abs(height) > abs(peak[3])):
+            peak = (start, stop, excursion, height, apex)
+
+    if peak is not None:
+        start, stop, excursion, height, apex = peak
+        exothermic = (height > 0) == DSC_EXO_UP
+        features.peak_type = 'exothermic' if exothermic else 'endothermic'
+        features.peak_temperature = float(temp[start + apex])
+        features.peak_heat_flow = abs(height)
+        # Area in W/g·min; positive for both peak types, heat released or absorbed per gram
+        features.enthalpy = abs(_trapezoid(excursion, t[start:stop + 1])) * 60.0
+
+        if apex >= 2:
+            leading_t = t[start:start + apex + 1]
+            slopes = np.gradient(excursion[:apex + 1], leading_t)
+            steepest = int(np.argmax(np.abs(slopes)))
+            if slopes[steepest] != 0:
+                onset_time = leading_t[steepest] - excursion[steepest] / slopes[steepest]
+                features.onset_temperature = _interp(np.clip(onset_time, t[0], t[-1]), t, temp)
+
+    if features.ramp_direction == 'heating':
+        limit = peak[0] if peak is not None else n
+        best = 0.0
+        for start, stop in steps:
+            if stop > limit:
+                continue
+            height = abs(smoothed[stop] - smoothed[start] - baseline_slope * (t[stop] - t[start]))
+            if height >= DSC_STEP_MIN_SNR * noise and height > best:
+                best = height
+                inflection = start + int(np.argmax(np.abs(deviation[start:stop + 1])))
+                features.glass_transition_temperature = float(temp[inflection])
+    return features
+
+
+def write_ramp_features(conn, material_id, dsc_ramp, features):
+    """Stores the features of one ramp under the transaction's source_file_id. Does not commit."""
+    if features is None:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO filamentquality.dsc_ramp_features (material_id, dsc_ramp, {', '.join(FEATURE_COLUMNS)}) "
+            f"VALUES (%s, %s, {', '.join(['%s'] * len(FEATURE_COLUMNS))})",
+            (material_id, dsc_ramp) + features.as_row()
+        )
+
+
+def rebuild_dsc_features(conn, material_id):
+    """
+    Recomputes the features of every DSC ramp already loaded for a material, one ramp in memory at a time,
+    for data loaded before features were extracted at ingest. Does not commit. Returns the number of ramps stored.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM filamentquality.dsc_ramp_features WHERE material_id = %s", (material_id,))
+        cursor.execute(
+            "SELECT DISTINCT source_file_id, dsc_ramp FROM filamentquality.material_thermal_characteristics "
+            "WHERE material_id = %s",
+            (material_id,)
+        )
+        ramps = cursor.fetchall()
+    stored = 0
+    for source_file_id, dsc_ramp in ramps:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT time_min, temperature, heat_flow FROM filamentquality.material_thermal_characteristics "
+                "WHERE material_id = %s AND dsc_ramp = %s AND source_file_id IS NOT DISTINCT FROM %s ORDER BY id",
+                (material_id, dsc_ramp, source_file_id)
+            )
+            rows = cursor.fetchall()
+        features = extract_ramp_features(*(np.array(column, dtype=np.float64) for column in zip(*rows))) if rows else None
+        if features is None:
+            continue
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO filamentquality.dsc_ramp_features (material_id, dsc_ramp, {', '.join(FEATURE_COLUMNS)}, "
+                f"source_file_id) VALUES (%s, %s, {', '.join(['%s'] * len(FEATURE_COLUMNS))}, %s)",
+                (material_id, dsc_ramp) + features.as_row() + (source_file_id,)
+            )
+        stored += 1
+    return stored
+
+
+def query_dsc_features(conn, material_ids=None):
+    """
+    Returns the stored ramp features of the given materials, or of all materials, as a list of dictionaries
+    ordered by material and ramp, ready to compare glass transition, melt peak and enthalpy across vendors.
+    """
+    query = (
+        f"SELECT f.material_id, m.vendor, f.dsc_ramp, {', '.join('f.' + column for column in FEATURE_COLUMNS)} "
+        "FROM filamentquality.dsc_ramp_features f JOIN filamentquality.materials m ON m.material_id = f.material_id"
+    )
+    params = ()
+    if material_ids:
+        query += " WHERE f.material_id = ANY(%s)"
+        params = (list(material_ids),)
+    with conn.cursor() as cursor:
+        cursor.execute(query + " ORDER BY f.material_id, f.id", params)
+        rows = cursor.fetchall()
+    return [dict(zip(('material_id', 'vendor', 'dsc_ramp') + FEATURE_COLUMNS, row)) for row in rows]
@@ -0,0 +1,66 @@
+import queue
+import threading
+from metrics import FileTimings, track_file, current_timings
+
+# Items a producer may run ahead of its consumer; bounds the memory held between the two stages
+PIPELINE_DEPTH = 2
+# Seconds a blocked producer waits between checks whether its consumer has gone away
+PIPELINE_POLL_INTERVAL = 0.1
+
+_ITEM, _ERROR, _DONE = range(3)
+
+
+def pipelined(iterable, depth=PIPELINE_DEPTH, name='ingest-producer'):
+    """
+    Iterates over iterable on a background thread and hands the items over through a bounded queue, so
+    producing the next item (reading, parsing, validating) overlaps with the caller's work on the current one
+    (writing to the database). The producer blocks while depth items are waiting, which caps memory.
+    An exception raised by the producer is re-raised in the caller. If the caller stops early, the producer
+    is told to stop and joined before the generator returns. The producer's stage timings are collected
+    separately and merged into those of the file being loaded on the calling thread once it has been joined.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    timings = current_timings()
+    producer_timings = FileTimings(track_peak_rss=False)
+
+    def put(kind, payload):
+        while not stop.is_set():
+            try:
+                items.put((kind, payload), timeout=PIPELINE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            with track_file(producer_timings):
+                for item in iterator:
+                    if not put(_ITEM, item):
+                        return
+            put(_DONE, None)
+        except BaseException as e:
+            put(_ERROR, e)
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()  # Release files held by a generator the consumer abandoned
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, payload = items.get()
+            if kind == _ITEM:
+                yield payload
+            elif kind == _ERROR:
+                raise payload
+            else:
+                return
+    finally:
+        stop.set()
+        thread.join()
+        if timings is not None:
+            timings.merge(producer_timings)
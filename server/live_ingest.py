@@ -0,0 +1,425 @@
+import os
+import csv
+import time
+import hashlib
+import threading
+import logging
+import psycopg2
+import numpy as np
+from database_operations import (
+    PURPOSE_MAPPING, extract_ids_from_filename, ensure_dimensions, resolve_characteristic_ids,
+    clear_characteristic_cache, sniff_live_print_dialect, iter_live_print_blocks, iter_long_samples,
+    write_live_print_samples, manifest_path, HASH_BLOCK_SIZE
+)
+from sample_parsing import RejectReport
+from connection_pool import PoolTimeoutError
+from query_cache import query_cache, ingest_tags
+from dimension_cache import dimensions
+from summary_stats import SummaryStats
+from metrics import metrics, log_rate_limited
+
+logger = logging.getLogger(__name__)
+
+LIVE_PURPOSE = "Live Print Data"
+# Seconds between checks for appended bytes; bounds sensor-to-table latency together with the COPY commit
+LIVE_POLL_INTERVAL = 0.2
+# Largest slice of a file written in one micro-batch; bigger backlogs are drained over consecutive batches
+LIVE_MAX_BATCH_BYTES = 4 * 1024 * 1024
+# Seconds to wait before retrying after the database became unavailable
+LIVE_RETRY_INTERVAL = 5
+# Seconds a file may go unchanged before its tailer and file descriptor are released; it is picked up again once it changes
+LIVE_IDLE_TIMEOUT = 600
+
+
+def file_signature(file_stat):
+    return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+
+class LiveFileTailer:
+    """
+    Follows one live print CSV while the printer is still appending to it.
+    Only complete lines are written, one transaction per micro-batch. The byte offset of the last
+    written line is kept in the file's ingest_manifest row (file_size, with the hash of the consumed
+    bytes), so a restarted server resumes where it stopped and a batch upload of the finished file
+    sees it as already loaded.
+    """
+    def __init__(self, filepath, released_inode=None):
+        self.filepath = filepath
+        self.manifest_path = manifest_path(filepath)
+        self.released_inode = released_inode  # Inode of the file at this path when an idle tailer was released
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.sha256 = hashlib.sha256()
+        self.source_file_id = None
+        self.dialect = None
+        self.header = None
+        self.column_names = None
+        self.column_ids = None
+        self.retry_at = 0.0  # Monotonic time before which a failing file is not polled again
+        self.signature = None  # (inode, size, mtime) of the file at the last poll
+        self.changed_at = time.monotonic()
+        self.material_id, self.vendor, self.part_type, self.part_id = extract_ids_from_filename(os.path.basename(filepath))
+        self.rows_written = 0
+        self.rows_rejected = 0
+
+    def poll(self, conn):
+        """
+        Writes every line completed since the last poll and returns the number of rows written.
+        Returns None once the file has gone away and its remaining lines were drained.
+        """
+        try:
+            file_stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            file_stat = None
+
+        rows = 0
+        if self.file is not None and (file_stat is None or file_stat.st_ino != self.inode or file_stat.st_size < self.offset):
+            rows += self._rotate(conn, file_stat)
+        if file_stat is None:
+            return rows or None
+        signature = file_signature(file_stat)
+        if signature != self.signature:
+            self.signature = signature
+            self.changed_at = time.monotonic()
+
+        if self.file is None:
+            self.file = open(self.filepath, 'rb')
+            self.inode = os.fstat(self.file.fileno()).st_ino
+        if self.header is None and not self._read_header():
+            return rows  # Header line not complete yet
+        if self.source_file_id is None:
+            self._register(conn)
+
+        while True:
+            written, more = self._write_batch(conn)
+            rows += written
+            if not more:
+                return rows
+
+    def idle_for(self, now):
+        """Seconds since the file was last seen to change."""
+        return now - self.changed_at
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _read_header(self):
+        self.file.seek(0)
+        line = self.file.readline()
+        if not line.endswith(b'\n'):
+            return False
+        self.header = line
+        header_text = line.decode('utf-8', errors='replace')
+        self.dialect = sniff_live_print_dialect(header_text)
+        self.column_names = next(csv.reader([header_text], self.dialect))
+        return True
+
+    def _register(self, conn, resume=True):
+        """
+        Resumes from the manifest entry if it describes a prefix of this file, otherwise starts the file afresh.
+        """
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT source_file_id, file_size, content_hash FROM filamentquality.ingest_manifest "
+                    "WHERE file_path = %s FOR UPDATE",
+                    (self.manifest_path,)
+                )
+                entry = cursor.fetchone()
+                if resume and entry and entry[1] >= len(self.header) and self._prefix_hash(entry[1]) == entry[2]:
+                    self.source_file_id, self.offset = entry[0], entry[1]
+                    logger.info(f"Resuming live ingest of {self.filepath} at byte {self.offset}.")
+                else:
+                    if entry and self.released_inode is not None and self.released_inode != self.inode:
+                        # Rotated while no tailer was open; the old file keeps its rows under its new name
+                        rotated_path = self._find_rotated_path(self.released_inode) or f"{self.filepath}#{self.released_inode}"
+                        cursor.execute("UPDATE filamentquality.ingest_manifest SET file_path = %s WHERE source_file_id = %s",
+                                       (rotated_path, entry[0]))
+                        logger.info(f"Live file {self.filepath} rotated to {rotated_path}.")
+                    elif entry:  # The file was rewritten since it was last loaded; its old rows go with the entry
+                        cursor.execute("DELETE FROM filamentquality.ingest_manifest WHERE source_file_id = %s", (entry[0],))
+                    self.offset = len(self.header)
+                    self.sha256 = hashlib.sha256(self.header)
+                    cursor.execute(
+                        "INSERT INTO filamentquality.ingest_manifest (file_path, purpose, file_size, file_mtime_ns, content_hash) "
+                        "VALUES (%s, %s, %s, %s, %s) RETURNING source_file_id",
+                        (self.manifest_path, LIVE_PURPOSE, self.offset, os.fstat(self.file.fileno()).st_mtime_ns, self.sha256.hexdigest())
+                    )
+                    self.source_file_id = cursor.fetchone()[0]
+                    logger.info(f"Started live ingest of {self.filepath}.")
+            ensure_dimensions(conn, self.material_id, self.vendor, self.part_id, self.part_type)
+            self.column_ids = None
+            conn.commit()
+            dimensions.commit(conn)
+        except Exception:
+            conn.rollback()
+            dimensions.rollback(conn)
+            self.source_file_id = None
+            raise
+
+    def _prefix_hash(self, size):
+        sha256 = hashlib.sha256()
+        self.file.seek(0)
+        remaining = size
+        while remaining > 0:
+            block = self.file.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                return None  # File is shorter than what was loaded
+            sha256.update(block)
+            remaining -= len(block)
+        self.sha256 = sha256
+        return sha256.hexdigest()
+
+    def _write_batch(self, conn):
+        """
+        Writes the complete lines after the current offset, up to LIVE_MAX_BATCH_BYTES.
+        Returns (rows written, whether a full batch was read and more may be waiting).
+        """
+        started = time.perf_counter()
+        self.file.seek(self.offset)
+        data = self.file.read(LIVE_MAX_BATCH_BYTES)
+        end = data.rfind(b'\n')
+        if end < 0:
+            return 0, False
+        chunk = data[:end + 1]
+        sha256 = self.sha256.copy()
+        sha256.update(chunk)
+        new_offset = self.offset + len(chunk)
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT source_file_id FROM filamentquality.ingest_manifest WHERE file_path = %s FOR UPDATE",
+                    (self.manifest_path,)
+                )
+                entry = cursor.fetchone()
+                if entry is None or entry[0] != self.source_file_id:
+                    # A batch upload replaced this file's rows; reload it from the start under a new entry
+                    conn.rollback()
+                    logger.warning(f"Manifest entry for {self.filepath} changed outside live ingest; restarting it.")
+                    self.source_file_id = None
+                    self._register(conn, resume=False)
+                    return 0, True
+                cursor.execute("SELECT set_config('filamentquality.source_file_id', %s, true)", (str(self.source_file_id),))
+
+            names = self.column_names[1:]
+            if self.column_ids is None:
+                characteristic_ids = resolve_characteristic_ids(conn, names)
+                self.column_ids = np.array([characteristic_ids[name] for name in names], dtype=np.int64)
+            # Malformed lines are dropped and counted rather than failing the batch, which would otherwise be
+            # retried from the same offset forever
+            lines = chunk.decode('utf-8', errors='replace').splitlines(keepends=True)
+            report = RejectReport()
+            summary = SummaryStats()
+            blocks = iter_long_samples(iter_live_print_blocks(lines, self.dialect.delimiter, names, report), report)
+            rows = write_live_print_samples(conn, blocks, self.part_id, self.column_ids, summary)
+            summary.write(conn, 'live_print_data', self.part_id)  # Merges into the statistics of earlier batches
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE filamentquality.ingest_manifest SET file_size = %s, file_mtime_ns = %s, content_hash = %s, "
+                    "rows_loaded = rows_loaded + %s, rows_rejected = rows_rejected + %s WHERE source_file_id = %s",
+                    (new_offset, os.fstat(self.file.fileno()).st_mtime_ns, sha256.hexdigest(), rows, report.total,
+                     self.source_file_id)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            clear_characteristic_cache()
+            self.column_ids = None
+            raise
+
+        self.offset = new_offset
+        self.sha256 = sha256
+        self.rows_written += rows
+        self.rows_rejected += report.total
+        metrics.increment("live.rows_written", rows)
+        if report.total:
+            metrics.increment("live.rows_rejected", report.total)
+            log_rate_limited(logger, logging.WARNING, ("live-rejected", self.filepath),
+                             "Rejected %d live print samples from %s: %s", report.total, self.filepath, report)
+        metrics.increment("live.bytes_read", len(chunk))
+        metrics.observe("live.batch_seconds", time.perf_counter() - started)
+        return rows, len(data) == LIVE_MAX_BATCH_BYTES
+
+    def _rotate(self, conn, file_stat):
+        """
+        Handles the path no longer pointing at the open file: drains the lines written to the old file,
+        then detaches its manifest entry so a new file at the same path starts from zero.
+        """
+        rows = 0
+        truncated = file_stat is not None and file_stat.st_ino == self.inode
+        if not truncated and self.source_file_id is not None:
+            more = True
+            while more:
+                written, more = self._write_batch(conn)
+                rows += written
+            rotated_path = self._find_rotated_path(self.inode) or f"{self.filepath}#{self.inode}"
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE filamentquality.ingest_manifest SET file_path = %s WHERE source_file_id = %s",
+                    (rotated_path, self.source_file_id)
+                )
+            conn.commit()
+            logger.info(f"Live file {self.filepath} rotated to {rotated_path}.")
+        elif truncated:
+            logger.info(f"Live file {self.filepath} was truncated; reloading it from the start.")
+
+        self.close()
+        self.source_file_id = None
+        self.header = None
+        self.column_ids = None
+        self.offset = 0
+        self.sha256 = hashlib.sha256()
+        return rows
+
+    def _find_rotated_path(self, inode):
+        directory = os.path.dirname(self.filepath)
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.inode() == inode:
+                return entry.path
+        return None
+
+
+class LiveIngestor:
+    """
+    Tails every live print file in one directory on a background thread, using one pooled connection.
+    Files that stop changing for idle_timeout seconds are closed and remembered by their signature only, so a
+    long-lived acquisition directory does not hold a descriptor for every file it ever saw.
+    """
+    def __init__(self, directory, pool, poll_interval=LIVE_POLL_INTERVAL, idle_timeout=LIVE_IDLE_TIMEOUT):
+        self.directory = directory
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.tailers = {}
+        self.idle = {}  # Path -> signature of files whose tailers were released while unchanged
+        self.ignored = set()  # Files whose names do not yield material and part IDs
+        self.errors = 0
+        self.rows_written = 0  # Of released tailers; active ones keep their own counts
+        self.rows_rejected = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"live-ingest:{directory}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=self.poll_interval * 10)
+
+    def stats(self):
+        tailers = list(self.tailers.values())
+        return {
+            "directory": self.directory,
+            "running": self._thread.is_alive(),
+            "files": len(tailers),
+            "idle_files": len(self.idle),
+            "rows_written": self.rows_written + sum(tailer.rows_written for tailer in tailers),
+            "rows_rejected": self.rows_rejected + sum(tailer.rows_rejected for tailer in tailers),
+            "errors": self.errors,
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.pool.connection() as conn:
+                    if conn is None:
+                        self._stop_event.wait(LIVE_RETRY_INTERVAL)
+                        continue
+                    while not self._stop_event.is_set():
+                        self._poll_once(conn)
+                        if conn.closed:
+                            break
+                        self._stop_event.wait(self.poll_interval)
+            except (PoolTimeoutError, psycopg2.Error) as e:
+                logger.error(f"Live ingest of {self.directory} lost its database connection: {e}")
+                self._stop_event.wait(LIVE_RETRY_INTERVAL)
+        for tailer in self.tailers.values():
+            tailer.close()
+
+    def _poll_once(self, conn):
+        extensions = PURPOSE_MAPPING[LIVE_PURPOSE]['extensions']
+        present = set()
+        for entry in os.scandir(self.directory):
+            if not (entry.is_file() and any(entry.name.endswith(ext) for ext in extensions)):
+                continue
+            present.add(entry.path)
+            if entry.path in self.tailers or entry.path in self.ignored:
+                continue
+            released_inode = None
+            if entry.path in self.idle:
+                if file_signature(entry.stat()) == self.idle[entry.path]:
+                    continue
+                released_inode = self.idle.pop(entry.path)[0]  # Changed since it was released; resumes from its manifest entry
+            tailer = LiveFileTailer(entry.path, released_inode)
+            if tailer.part_id is None:
+                self.ignored.add(entry.path)
+                continue
+            self.tailers[entry.path] = tailer
+        # Forget files that are gone so neither set grows with the directory's history
+        self.idle = {path: signature for path, signature in self.idle.items() if path in present}
+        self.ignored &= present
+
+        now = time.monotonic()
+        for path, tailer in list(self.tailers.items()):
+            if tailer.retry_at > now:
+                continue
+            try:
+                rows = tailer.poll(conn)
+                if rows:
+                    query_cache.invalidate(ingest_tags(tailer.material_id, tailer.part_id))
+                if rows is None:
+                    self._release(path)
+                elif tailer.idle_for(now) >= self.idle_timeout:
+                    self._release(path)
+                    self.idle[path] = tailer.signature
+            except psycopg2.OperationalError:
+                raise  # Connection-level failure; reconnect
+            except Exception as e:
+                self.errors += 1
+                tailer.retry_at = now + LIVE_RETRY_INTERVAL
+                metrics.increment("live.errors")
+                log_rate_limited(logger, logging.ERROR, ("live-failed", path), "Live ingest of %s failed: %s", path, e)
+
+    def _release(self, path):
+        tailer = self.tailers.pop(path)
+        tailer.close()
+        self.rows_written += tailer.rows_written
+        self.rows_rejected += tailer.rows_rejected
+
+
+_ingestors = {}
+_ingestors_lock = threading.Lock()
+
+def start_live_ingest(directory, pool):
+    directory = os.path.realpath(directory)  # Files are recorded in the manifest under their resolved paths
+    with _ingestors_lock:
+        if directory in _ingestors:
+            return _ingestors[directory]
+        ingestor = LiveIngestor(directory, pool)
+        _ingestors[directory] = ingestor
+    ingestor.start()
+    logger.info(f"Live ingest started for {directory}.")
+    return ingestor
+
+def stop_live_ingest(directory):
+    with _ingestors_lock:
+        ingestor = _ingestors.pop(os.path.realpath(directory), None)
+    if ingestor:
+        ingestor.stop()
+        logger.info(f"Live ingest stopped for {ingestor.directory}.")
+    return ingestor
+
+def live_ingest_status():
+    with _ingestors_lock:
+        ingestors = list(_ingestors.values())
+    return [ingestor.stats() for ingestor in ingestors]
+
+def stop_all_live_ingest():
+    with _ingestors_lock:
+        directories = list(_ingestors)
+    for directory in directories:
+        stop_live_ingest(directory)
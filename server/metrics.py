@@ -0,0 +1,250 @@
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Upper bounds in seconds of the latency histogram buckets; the last bucket catches everything slower
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, math.inf)
+# Stages a file's load time is split into
+INGEST_STAGES = ('read', 'parse', 'write', 'commit')
+# Seconds between two messages logged under the same key by log_rate_limited
+LOG_RATE_LIMIT_INTERVAL = 10.0
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations. Cheap to update from hot paths and reports approximate percentiles.
+    """
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations, capped at the largest one seen."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": round(self.min, 6),
+            "max": round(self.max, 6),
+            "mean": round(self.total / self.count, 6),
+            "p50": round(self.percentile(0.5), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "p99": round(self.percentile(0.99), 6),
+            "buckets": [[bound if bound != math.inf else "inf", count]
+                        for bound, count in zip(self.buckets, self.counts) if count],
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters, gauges and latency histograms, keyed by dotted names such as 'ingest.write_seconds'.
+    """
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def adjust_gauge(self, name, delta):
+        with self._lock:
+            self._gauges[name] = self._gauges.get(name, 0) + delta
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def record_ingest_result(self, result):
+        """Adds a file result from ingest_file, possibly produced in a worker process, to the ingest metrics."""
+        self.increment(f"ingest.files.{result['status'].lower()}")
+        self.increment("ingest.rows_written", result.get("rows", 0))
+        self.increment("ingest.rows_rejected", result.get("rows_rejected", 0))
+        timings = result.get("timings")
+        if not timings:
+            return
+        self.increment("ingest.bytes_read", timings["bytes_read"])
+        for stage, seconds in timings["stages"].items():
+            self.observe(f"ingest.{stage}_seconds", seconds)
+        self.observe("ingest.file_seconds", timings["seconds"])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 3),
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {name: histogram.snapshot() for name, histogram in self._histograms.items()},
+            }
+
+
+metrics = MetricsRegistry()
+
+
+def reset_peak_rss():
+    """
+    Restarts the high-water mark of this process's resident memory so peak_rss_bytes() reports the peak from now on.
+    Needs Linux's /proc/self/clear_refs; returns False where the mark cannot be reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_bytes():
+    """
+    High-water mark of this process's resident memory since reset_peak_rss() or process start (VmHWM), or None
+    where the platform does not report it. Falls back to the process-lifetime peak where /proc is unavailable.
+    """
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024  # Reported in kB
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # ru_maxrss is in KiB on Linux
+
+
+class FileTimings:
+    """
+    Time spent per stage while loading one file, filled in by stage() and timed_iter() on the loading thread,
+    and the peak resident memory of the process while it loaded. The peak is measured from a high-water mark
+    reset when the file starts, so it is per file in worker processes; files loaded concurrently on threads of
+    one process share the mark, so their peaks are approximate.
+    """
+    def __init__(self, track_peak_rss=True):
+        self.stages = dict.fromkeys(INGEST_STAGES, 0.0)
+        self.bytes_read = 0
+        self.started = time.perf_counter()
+        self.peak_rss_tracked = track_peak_rss and reset_peak_rss()
+
+    def merge(self, other):
+        """Adds the stage times and bytes another thread collected for the same file."""
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.bytes_read += other.bytes_read
+
+    def as_dict(self):
+        return {
+            "seconds": round(time.perf_counter() - self.started, 6),
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            "bytes_read": self.bytes_read,
+            "peak_rss_bytes": peak_rss_bytes() if self.peak_rss_tracked else None,
+        }
+
+
+_active = threading.local()
+
+@contextmanager
+def track_file(timings=None):
+    """
+    Collects the stage timings of the file loaded on this thread until the block exits.
+    FileTimings are updated without locking, so each thread needs its own; see FileTimings.merge().
+    """
+    timings = _active.timings = timings or FileTimings()
+    try:
+        yield timings
+    finally:
+        _active.timings = None
+
+def current_timings():
+    return getattr(_active, 'timings', None)
+
+@contextmanager
+def stage(name):
+    """Adds the time spent in the block to the named stage of the file being loaded on this thread, if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(_active, 'timings', None)
+        if timings is not None:
+            timings.stages[name] += time.perf_counter() - started
+
+def timed_iter(name, iterable):
+    """Yields from iterable, charging the time spent producing each item to the named stage."""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            item = next(iterator, StopIteration)
+        if item is StopIteration:
+            return
+        yield item
+
+def add_bytes_read(count):
+    timings = getattr(_active, 'timings', None)
+    if timings is not None:
+        timings.bytes_read += count
+
+
+_last_logged = {}
+_suppressed = {}
+_log_lock = threading.Lock()
+
+def log_rate_limited(logger, level, key, message, *args, interval=LOG_RATE_LIMIT_INTERVAL):
+    """
+    Logs at most one message per key every interval seconds; the next message that gets through
+    reports how many were dropped in between. For messages that can repeat once per file or batch.
+    """
+    now = time.monotonic()
+    with _log_lock:
+        if now - _last_logged.get(key, -math.inf) < interval:
+            _suppressed[key] = _suppressed.get(key, 0) + 1
+            return
+        _last_logged[key] = now
+        suppressed = _suppressed.pop(key, 0)
+    if suppressed:
+        message += f" ({suppressed} similar messages suppressed)"
+    logger.log(level, message, *args)
+
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+
+# Results kept before the least recently used one is evicted
+QUERY_CACHE_MAX_ENTRIES = 512
+# Tag of results read across every material, dropped whenever data of any material changes
+ALL_MATERIALS_TAG = ("material", "*all*")
+
+MISSING = object()
+
+
+class QueryCache:
+    """
+    Bounded LRU cache for read-path results. Every entry is tagged with the ("part", part_id) and
+    ("material", material_id) keys it was computed from, so an upload drops exactly the entries it affects.
+    Each tag carries a generation counter: a result computed while its tags were invalidated is not stored,
+    which keeps a slow query that raced an upload from caching pre-upload data.
+    """
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, tags)
+        self._keys_by_tag = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, tags):
+        """
+        Returns (value, token). On a miss value is MISSING and token must be passed to put.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], None
+            self.misses += 1
+            return MISSING, tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def put(self, key, value, tags, token):
+        with self._lock:
+            if token != tuple(self._generations.get(tag, 0) for tag in tags):
+                return  # Invalidated while the value was being computed
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        """Drops every entry carrying any of the tags and returns how many were dropped."""
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._keys_by_tag.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove_locked(key)
+                        dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            for tag in self._keys_by_tag:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove_locked(self, key):
+        _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+query_cache = QueryCache()
+
+def ingest_tags(material_id=None, part_id=None):
+    tags = []
+    if material_id:
+        tags.append(("material", material_id))
+    if part_id:
+        tags.append(("part", part_id))
+    return tags
+
+def material_tags(material_ids):
+    """Tags of a read over the given materials, or over all of them when none are given."""
+    return [("material", material_id) for material_id in material_ids] if material_ids else [ALL_MATERIALS_TAG]
+
+def material_change_tags(material_id):
+    """Tags to invalidate when a material's data changes: its own reads and those across all materials."""
+    return ingest_tags(material_id=material_id) + [ALL_MATERIALS_TAG]
+
+def invalidate_for_ingest_result(result):
+    """Drops cached reads of the part and material a successfully loaded file wrote to."""
+    if result.get("status") == "Success":
+        tags = ingest_tags(result.get("material_id"), result.get("part_id"))
+        if result.get("material_id"):
+            tags.append(ALL_MATERIALS_TAG)
+        query_cache.invalidate(tags)
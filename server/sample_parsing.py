@@ -0,0 +1,157 @@
+from itertools import islice
+import numpy as np
+
+# Values beyond this magnitude cannot be stored in the REAL sample columns and would abort the COPY
+REAL_MAX = float(np.finfo(np.float32).max)
+# Plausible (low, high) range per characteristic name; either bound may be None
+VALUE_LIMITS = {}
+# Characteristic names whose readings further than this many scaled median absolute deviations from their block's
+# median are rejected as outliers. Empty by default: steps and excursions such as extrusion starts or diameter
+# bulges are real signal, so only characteristics known to suffer isolated sensor glitches should be listed
+OUTLIER_MAD_THRESHOLDS = {}
+# Range of the time/position column every sample is keyed by
+AXIS_LIMITS = (0.0, None)
+# Reasons a sample can be rejected for, in the order they are checked
+REJECT_REASONS = ('malformed_line', 'non_numeric', 'out_of_range', 'outlier')
+
+
+class RejectReport:
+    """
+    Counts the samples of one file that failed parsing or validation, by reason.
+    A rejected sample is counted once, under the first check it failed; a malformed line counts as one reject.
+    """
+    def __init__(self):
+        self.counts = dict.fromkeys(REJECT_REASONS, 0)
+
+    def add(self, reason, count):
+        self.counts[reason] += int(count)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def as_dict(self):
+        return {reason: count for reason, count in self.counts.items() if count}
+
+    def __str__(self):
+        return ', '.join(f"{count} {reason.replace('_', ' ')}" for reason, count in self.as_dict().items()) or 'none'
+
+
+def iter_line_blocks(file, block_size):
+    """
+    Yields lists of at most block_size lines from the current position of a text file.
+    """
+    while True:
+        lines = list(islice(file, block_size))
+        if not lines:
+            return
+        yield lines
+
+
+def _parse_float(cell):
+    try:
+        return float(cell.strip().strip('"'))
+    except ValueError:
+        return np.nan
+
+def _parse_uniform_block(lines, delimiter, fields):
+    """
+    Parses lines that all hold the same number of fields with a single C-level pass over the joined text.
+    Returns None when any cell is not a number, so the caller can fall back to cell-by-cell parsing.
+    """
+    text = ''.join(lines).replace('\r\n', '\n').rstrip('\n').replace('\n', delimiter)
+    try:
+        values = np.fromstring(text, dtype=np.float64, sep=delimiter)
+    except ValueError:
+        return None
+    if values.size != len(lines) * fields:
+        return None
+    return values.reshape(len(lines), fields)
+
+def parse_numeric_block(lines, delimiter, usecols, report):
+    """
+    Parses delimited text lines into an (n_lines, len(usecols)) float64 array.
+    Blank lines are ignored; lines too short to hold every column in usecols are counted as malformed and dropped.
+    Cells that are not numbers come back as NaN and are rejected by validate_samples.
+    """
+    width = max(usecols) + 1
+    usecols = list(usecols)
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return np.empty((0, len(usecols)), dtype=np.float64)
+
+    fields = lines[0].count(delimiter) + 1
+    if fields >= width and all(line.count(delimiter) + 1 == fields for line in lines):
+        values = _parse_uniform_block(lines, delimiter, fields)
+        if values is not None:
+            return values[:, usecols]
+
+    rows = [row[:width] for row in (line.rstrip('\r\n').split(delimiter) for line in lines) if len(row) >= width]
+    report.add('malformed_line', len(lines) - len(rows))
+    if not rows:
+        return np.empty((0, len(usecols)), dtype=np.float64)
+    cells = [row[column] for row in rows for column in usecols]
+    values = np.fromiter(map(_parse_float, cells), dtype=np.float64, count=len(cells))
+    return values.reshape(len(rows), len(usecols))
+
+
+def _range_mask(values, limits):
+    low, high = limits
+    mask = np.abs(values) > REAL_MAX
+    if low is not None:
+        mask |= values < low
+    if high is not None:
+        mask |= values > high
+    return mask
+
+def validate_samples(axis, values, names, report, axis_limits=AXIS_LIMITS):
+    """
+    Vectorized checks of one block of wide samples: axis holds the time or position of each of the n rows and
+    values the (n, k) readings of the characteristics in names. Returns an (n, k) mask of the samples to keep.
+    A row whose axis value is missing or out of range loses all of its samples; otherwise each reading is checked
+    on its own for NaN/inf, the REAL range and VALUE_LIMITS, and, for characteristics in OUTLIER_MAD_THRESHOLDS
+    only, for outliers against the block's median and MAD.
+    """
+    keep = np.ones(values.shape, dtype=bool)
+
+    def reject(mask, reason):
+        rejected = mask & keep
+        report.add(reason, rejected.sum())
+        keep[rejected] = False
+
+    reject(~np.isfinite(axis)[:, None], 'non_numeric')
+    reject(_range_mask(axis, axis_limits)[:, None], 'out_of_range')
+    reject(~np.isfinite(values), 'non_numeric')
+    reject(np.column_stack([
+        _range_mask(values[:, j], VALUE_LIMITS.get(name, (None, None))) for j, name in enumerate(names)
+    ]), 'out_of_range')
+
+    # Outliers are judged only against readings that passed the checks above
+    outliers = np.zeros(values.shape, dtype=bool)
+    for j, name in enumerate(names):
+        threshold = OUTLIER_MAD_THRESHOLDS.get(name)
+        if threshold is None:
+            continue
+        kept = values[keep[:, j], j]
+        if len(kept) < 3:
+            continue
+        median = np.median(kept)
+        mad = np.median(np.abs(kept - median)) * 1.4826
+        if mad > 0:
+            outliers[:, j] = np.abs(values[:, j] - median) > threshold * mad
+    reject(outliers, 'outlier')
+    return keep
+
+
+def wide_to_long(axis, values, column_ids, keep):
+    """
+    Melts a block of wide samples into long columns (axis, characteristic_id, value), dropping rejected samples.
+    Rows stay in file order with the characteristics of a row in column order.
+    """
+    n, k = values.shape
+    keep = keep.ravel()
+    return (
+        np.repeat(axis, k)[keep],
+        np.tile(np.asarray(column_ids, dtype=np.int64), n)[keep],
+        values.ravel()[keep],
+    )
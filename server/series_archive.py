@@ -0,0 +1,202 @@
+import os
+import uuid
+import zlib
+import numpy as np
+import psycopg2
+
+# How pressure and diameter samples are stored: 'rows' (one row per sample), 'archive' (compressed chunks in
+# sample_series_chunks) or 'both'
+SERIES_STORAGE_MODE = os.environ.get('FILAMENTQUALITY_SERIES_STORAGE', 'rows')
+# Samples per archived chunk; a range read decompresses whole chunks
+SERIES_CHUNK_SIZE = 32768
+# zlib level of archived chunks
+SERIES_COMPRESSION_LEVEL = 6
+# Rows archive_part fetches per round trip from its server-side cursor; bounds the rows held while archiving
+ARCHIVE_FETCH_ROWS = 65536
+# Sample tables that can be archived, with the column that orders their samples
+ARCHIVE_SOURCES = {
+    "part_characteristics": "time_elapsed",
+    "benchtop_filament_diameter": "position",
+}
+
+# First byte of an encoded column: how the float32 values were transformed before compression
+CODEC_SHUFFLE = 0
+CODEC_DELTA_SHUFFLE = 1
+
+
+def encode_column(values, delta=False):
+    """
+    Compresses a float32 column losslessly: optional delta of the IEEE bit patterns (monotonic time and position
+    columns become near-constant), then a byte shuffle that groups the 4 bytes of every value into planes, then zlib.
+    """
+    bits = np.ascontiguousarray(values, dtype='<f4').view('<u4')
+    if delta:
+        bits = np.diff(bits, prepend=np.uint32(0))  # Wraps modulo 2**32, undone by cumsum in decode_column
+    shuffled = bits.view(np.uint8).reshape(-1, 4).T.tobytes()
+    codec = CODEC_DELTA_SHUFFLE if delta else CODEC_SHUFFLE
+    return bytes([codec]) + zlib.compress(shuffled, SERIES_COMPRESSION_LEVEL)
+
+def decode_column(data, count):
+    data = bytes(data)
+    planes = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).reshape(4, count)
+    bits = np.ascontiguousarray(planes.T).view('<u4').ravel()
+    if data[0] == CODEC_DELTA_SHUFFLE:
+        bits = np.cumsum(bits, dtype=np.uint32)
+    return bits.view('<f4')
+
+
+class SeriesArchiveWriter:
+    """
+    Buffers the long (axis, characteristic_id, value) blocks a loader produces for one part and writes every
+    characteristic's samples as compressed chunks of SERIES_CHUNK_SIZE samples. Chunks take the transaction's
+    source_file_id like the sample rows, so replacing a file drops its chunks too. Call close() to flush the tails.
+    """
+    def __init__(self, conn, source, part_id, source_file_id=None, chunk_size=SERIES_CHUNK_SIZE):
+        if source not in ARCHIVE_SOURCES:
+            raise ValueError(f"Unknown archive source: {source}")
+        self.conn = conn
+        self.source = source
+        self.part_id = part_id
+        self.source_file_id = source_file_id
+        self.chunk_size = chunk_size
+        self.samples_written = 0
+        self.bytes_written = 0
+        self._pending = {}  # characteristic_id -> ([axis arrays], [value arrays], sample count)
+
+    def append(self, axis, characteristic_ids, values):
+        for characteristic_id in np.unique(characteristic_ids):
+            mask = characteristic_ids == characteristic_id
+            axis_parts, value_parts, count = self._pending.get(int(characteristic_id), ([], [], 0))
+            axis_parts.append(np.asarray(axis[mask], dtype=np.float32))
+            value_parts.append(np.asarray(values[mask], dtype=np.float32))
+            count += int(mask.sum())
+            self._pending[int(characteristic_id)] = (axis_parts, value_parts, count)
+            if count >= self.chunk_size:
+                self._flush(int(characteristic_id), final=False)
+
+    def close(self):
+        for characteristic_id in list(self._pending):
+            self._flush(characteristic_id, final=True)
+        return self.samples_written
+
+    def _flush(self, characteristic_id, final):
+        axis_parts, value_parts, count = self._pending.pop(characteristic_id)
+        axis = np.concatenate(axis_parts)
+        values = np.concatenate(value_parts)
+        full = len(axis) if final else len(axis) - len(axis) % self.chunk_size
+        rows = []
+        for start in range(0, full, self.chunk_size):
+            chunk_axis = axis[start:start + self.chunk_size]
+            chunk_values = values[start:start + self.chunk_size]
+            axis_data = encode_column(chunk_axis, delta=True)
+            value_data = encode_column(chunk_values)
+            self.bytes_written += len(axis_data) + len(value_data)
+            rows.append((self.part_id, self.source, characteristic_id, float(chunk_axis.min()), float(chunk_axis.max()),
+                         len(chunk_axis), psycopg2.Binary(axis_data), psycopg2.Binary(value_data)))
+        if rows:
+            with self.conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO filamentquality.sample_series_chunks (part_id, source_table, characteristic_id, "
+                    "axis_min, axis_max, sample_count, axis_data, value_data, source_file_id) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, "
+                    "COALESCE(%s, NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER))",
+                    [row + (self.source_file_id,) for row in rows]
+                )
+            self.samples_written += full
+        if full < len(axis):
+            self._pending[characteristic_id] = ([axis[full:]], [values[full:]], len(axis) - full)
+
+
+def read_series(conn, source, part_id, characteristic_id, start=None, end=None):
+    """
+    Reads one archived series, decompressing only the chunks that overlap [start, end].
+    Returns (axis, values) float64 arrays sorted by axis, or None when the series has no archived chunks.
+    """
+    if source not in ARCHIVE_SOURCES:
+        return None
+    start = float("-inf") if start is None else float(start)
+    end = float("inf") if end is None else float(end)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT sample_count, axis_data, value_data FROM filamentquality.sample_series_chunks "
+            "WHERE part_id = %s AND source_table = %s AND characteristic_id = %s "
+            "AND axis_max >= %s AND axis_min <= %s ORDER BY axis_min",
+            (part_id, source, characteristic_id, start, end)
+        )
+        chunks = cursor.fetchall()
+    if not chunks:
+        return None if not series_is_archived(conn, source, part_id, characteristic_id) else (np.empty(0), np.empty(0))
+
+    axis = np.concatenate([decode_column(axis_data, count) for count, axis_data, _ in chunks]).astype(np.float64)
+    values = np.concatenate([decode_column(value_data, count) for count, _, value_data in chunks]).astype(np.float64)
+    keep = (axis >= start) & (axis <= end)
+    axis, values = axis[keep], values[keep]
+    if len(axis) > 1 and np.any(axis[1:] < axis[:-1]):  # Chunks of several files overlapping in time
+        order = np.argsort(axis, kind='stable')
+        axis, values = axis[order], values[order]
+    return axis, values
+
+def archived_source_files(conn, source, part_id, characteristic_id):
+    """
+    Source files with archived chunks of one series. Their chunks supersede any sample rows they also kept,
+    while the rows of other files of the series are still current. None stands for samples without a source file.
+    """
+    if source not in ARCHIVE_SOURCES:
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT source_file_id FROM filamentquality.sample_series_chunks "
+            "WHERE part_id = %s AND source_table = %s AND characteristic_id = %s",
+            (part_id, source, characteristic_id)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+def series_is_archived(conn, source, part_id, characteristic_id):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM filamentquality.sample_series_chunks "
+            "WHERE part_id = %s AND source_table = %s AND characteristic_id = %s)",
+            (part_id, source, characteristic_id)
+        )
+        return cursor.fetchone()[0]
+
+
+def archive_part(conn, source, part_id, keep_rows=False):
+    """
+    Moves the sample rows of one part from a source table into compressed chunks, one set of chunks per
+    source file and characteristic, so existing data can be shrunk in place. Each source file is streamed through
+    a server-side named cursor in ARCHIVE_FETCH_ROWS batches and its chunks are written as they fill, so memory
+    stays bounded however large the file. Does not commit. Returns (samples archived, compressed bytes written).
+    """
+    if source not in ARCHIVE_SOURCES:
+        raise ValueError(f"Unknown archive source: {source}")
+    axis_column = ARCHIVE_SOURCES[source]
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT source_file_id FROM filamentquality.{source} WHERE part_id = %s", (part_id,)
+        )
+        source_file_ids = [row[0] for row in cursor.fetchall()]
+
+    samples, compressed = 0, 0
+    for source_file_id in source_file_ids:
+        writer = SeriesArchiveWriter(conn, source, part_id, source_file_id=source_file_id)
+        with conn.cursor(name=f"archive_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = ARCHIVE_FETCH_ROWS
+            cursor.execute(
+                f"SELECT {axis_column}, characteristic_id, characteristic_value FROM filamentquality.{source} "
+                f"WHERE part_id = %s AND source_file_id IS NOT DISTINCT FROM %s ORDER BY characteristic_id, {axis_column}",
+                (part_id, source_file_id)
+            )
+            while True:
+                rows = cursor.fetchmany(ARCHIVE_FETCH_ROWS)
+                if not rows:
+                    break
+                axis, characteristic_ids, values = (np.array(column) for column in zip(*rows))
+                writer.append(axis, characteristic_ids, values)
+        samples += writer.close()
+        compressed += writer.bytes_written
+
+    if not keep_rows:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM filamentquality.{source} WHERE part_id = %s", (part_id,))
+    return samples, compressed
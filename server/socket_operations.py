@@ -1,84 +1,458 @@
-import socket
-import json
+import os
+import sys
+import time
+import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from database_operations import connect_to_database, process_files_in_directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.message_framing import read_message, write_message, write_binary, ProtocolError
+from connection_pool import authenticate, close_all_pools, pool_stats, PoolTimeoutError
+from upload_jobs import JobManager
+from timeseries import query_time_series
+from series_archive import archive_part
+from summary_stats import query_summary, rebuild_summary_stats
+from data_export import stream_export, EXPORT_BATCH_ROWS
+from dsc_features import query_dsc_features, rebuild_dsc_features
+from query_cache import query_cache, ingest_tags, material_tags, material_change_tags, MISSING
+from live_ingest import start_live_ingest, stop_live_ingest, live_ingest_status, stop_all_live_ingest
+from directory_watch import start_watch, stop_watch, watch_status
+from metrics import metrics
+from dimension_cache import dimensions
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def handle_client(client_socket):
+SERVER_HOST = 'localhost'
+SERVER_PORT = 5555
+# Pending connections the OS queues before accept
+SERVER_BACKLOG = 512
+# Threads available for blocking database and parsing work across all sessions
+DB_EXECUTOR_WORKERS = 16
+
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='db')
+job_manager = JobManager()
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking call on the bounded database executor so the event loop keeps serving other sessions.
+    """
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+
+    def call():
+        metrics.observe("db_executor.queue_wait_seconds", time.perf_counter() - submitted)
+        return func(*args, **kwargs)
+
+    metrics.adjust_gauge("db_executor.pending", 1)
+    try:
+        return await loop.run_in_executor(db_executor, call)
+    finally:
+        metrics.adjust_gauge("db_executor.pending", -1)
+
+def with_pooled_connection(pool, func, *args, **kwargs):
+    """
+    Calls func(conn, ...) on a connection borrowed from the pool. Blocking; runs on the database executor.
+    """
+    with pool.connection() as conn:
+        if not conn:
+            raise ConnectionError("No DB connection")
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            conn.rollback()  # Read paths never leave a transaction open on a pooled connection
+
+def with_pooled_transaction(pool, func, *args, **kwargs):
+    """
+    Calls func(conn, ...) on a pooled connection and commits its changes, or rolls them back if it raised.
+    Blocking; runs on the database executor.
+    """
+    with pool.connection() as conn:
+        if not conn:
+            raise ConnectionError("No DB connection")
+        try:
+            result = func(conn, *args, **kwargs)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+
+def collect_stats(owner):
+    """
+    Counters and latency histograms of this server process, together with cache, pool, live ingest and watch state
+    and the active jobs submitted with owner's credentials.
+    """
+    jobs = job_manager.list_jobs(owner=owner)
+    return {
+        "metrics": metrics.snapshot(),
+        "cache": query_cache.stats(),
+        "dimensions": dimensions.stats(),  # This process only; ingest worker processes keep their own
+        "pools": pool_stats(),
+        "jobs": [job for job in jobs if job["status"] in ("Queued", "Running")],
+        "live": live_ingest_status(),
+        "watch": watch_status(),
+    }
+
+async def send_export(writer, pool, data_json):
+    """
+    Answers ExportData: an ExportStarted message, the Arrow IPC stream as binary frames, then ExportComplete,
+    or an Error message if the export could not start or failed part way. Every batch is fetched on the
+    database executor and the next one is not read before the previous frame has drained to the client.
+    """
+    filters = {"material_id": data_json.get('material_id'), "part_id": data_json.get('part_id')}
+    frames = stream_export(pool, data_json.get('source'), filters, data_json.get('batch_rows') or EXPORT_BATCH_ROWS,
+                           data_json.get('compression'))
+    started = False
+    rows = batches = sent = 0
+    try:
+        while True:
+            try:
+                frame = await run_blocking(next, frames, None)
+            except (ValueError, ConnectionError, PoolTimeoutError) as e:
+                await write_message(writer, {"status": "Error", "message": str(e)})
+                return
+            except Exception as e:
+                logging.error(f"ExportData failed after {rows} rows: {e}")
+                await write_message(writer, {"status": "Error", "message": "Export failed"})
+                return
+            if frame is None:
+                break
+            data, batch_rows = frame
+            if not started:
+                await write_message(writer, {"status": "ExportStarted", "source": data_json.get('source')})
+                started = True
+            if data:
+                await write_binary(writer, data)
+                sent += len(data)
+            if batch_rows:
+                rows += batch_rows
+                batches += 1
+    finally:
+        await run_blocking(frames.close)  # Returns the connection to the pool if the export stopped early
+    metrics.increment("export.rows", rows)
+    metrics.increment("export.bytes", sent)
+    await write_message(writer, {"status": "ExportComplete", "rows": rows, "batches": batches, "bytes": sent})
+
+async def handle_client(reader, writer):
     logging.info("Client connected.")
-    conn = None
+    metrics.increment("connections.opened")
+    metrics.adjust_gauge("connections.active", 1)
+    pool = None
+    password = None
 
     try:
         # Keep listening for data from client
         while True:
-            # Receive data from the client
-            data = client_socket.recv(1024).decode()
-            if not data:
+            # Receive one complete framed message from the client
+            data_json = await read_message(reader)
+            if data_json is None:
                 logging.info("No data received. Closing connection.")
                 break
+            if not isinstance(data_json, dict):
+                raise ProtocolError("Requests must be JSON objects")
 
-            data_json = json.loads(data)
             # Handling based on command
+            command = 'password' if 'password' in data_json else data_json.get('command')
+            started = time.perf_counter()
             if 'password' in data_json:
                 # This assumes your password verification logic is moved here
                 password = data_json['password']
-                conn = connect_to_database(password)
-                if conn:
-                    response = {"status": "Correct"}
-                    logging.info("Password correct. Database connection established.")
-                else:
-                    response = {"status": "Incorrect"}
-                    logging.info("Password incorrect. No database connection.")
-                client_socket.sendall(json.dumps(response).encode())
+                try:
+                    pool = await run_blocking(authenticate, password)
+                    if pool:
+                        response = {"status": "Correct"}
+                        logging.info("Password correct. Database connection pool ready.")
+                    else:
+                        response = {"status": "Incorrect"}
+                        logging.info("Password incorrect. No database connection.")
+                except PoolTimeoutError as e:
+                    pool = None
+                    response = {"status": "Error", "message": "Database busy"}
+                    logging.warning(f"Could not verify password: {e}")
+                await write_message(writer, response)
 
             elif data_json.get('command') == 'DataUpload':
                 logging.info("Received command: DataUpload")
                 selected_directories = data_json.get('selected_directories', {})
-                if conn:
-                    upload_data(client_socket, selected_directories, conn)
+                if pool:
+                    job = job_manager.submit(pool, selected_directories, password)
+                    response = {"status": "JobSubmitted", "job_id": job.job_id}
                 else:
                     logging.error("No database connection established for data upload.")
-                    client_socket.sendall(json.dumps({"status": "Error", "message": "No DB connection"}).encode())
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'JobStatus':
+                job = job_manager.get(data_json.get('job_id'), owner=pool) if pool else None
+                if job:
+                    response = {"status": "JobStatus", "job": job.snapshot()}
+                elif pool:
+                    response = {"status": "Error", "message": "Unknown job"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'ListJobs':
+                if pool:
+                    response = {"status": "Jobs", "jobs": job_manager.list_jobs(owner=pool)}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'CancelJob':
+                job = job_manager.cancel(data_json.get('job_id'), owner=pool) if pool else None
+                if job:
+                    response = {"status": "JobCancelling", "job": job.snapshot()}
+                elif pool:
+                    response = {"status": "Error", "message": "Unknown job"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'StartLiveIngest':
+                directory = data_json.get('directory', '')
+                if not pool:
+                    response = {"status": "Error", "message": "No DB connection"}
+                elif not os.path.isdir(directory):
+                    response = {"status": "Error", "message": f"Not a directory: {directory}"}
+                else:
+                    response = {"status": "LiveIngestStarted", "live": start_live_ingest(directory, pool).stats()}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'StopLiveIngest':
+                ingestor = await run_blocking(stop_live_ingest, data_json.get('directory', '')) if pool else None
+                if ingestor:
+                    response = {"status": "LiveIngestStopped", "live": ingestor.stats()}
+                elif pool:
+                    response = {"status": "Error", "message": "Live ingest not running for directory"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'LiveIngestStatus':
+                if pool:
+                    response = {"status": "LiveIngest", "live": live_ingest_status()}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'StartWatch':
+                if not pool:
+                    response = {"status": "Error", "message": "No DB connection"}
+                else:
+                    try:
+                        watcher = await run_blocking(start_watch, data_json.get('selected_directories', {}), pool,
+                                                     password, job_manager)
+                        response = {"status": "WatchStarted", "watch": watcher.stats()}
+                    except (ValueError, OSError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'StopWatch':
+                watcher = await run_blocking(stop_watch) if pool else None
+                if watcher:
+                    response = {"status": "WatchStopped", "watch": watcher.stats()}
+                elif pool:
+                    response = {"status": "Error", "message": "Directory watch not running"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'WatchStatus':
+                if pool:
+                    response = {"status": "Watch", "watch": watch_status()}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'QueryTimeSeries':
+                if pool:
+                    part_id = data_json.get('part_id')
+                    source = data_json.get('source', 'part_characteristics')
+                    max_points = data_json.get('max_points', 2000)
+                    cache_key = ('QueryTimeSeries', part_id, data_json.get('characteristic'), data_json.get('start'),
+                                 data_json.get('end'), max_points, source)
+                    cache_tags = ingest_tags(part_id=part_id)
+                    series, cache_token = query_cache.get(cache_key, cache_tags)
+                    try:
+                        if series is MISSING:
+                            series = await run_blocking(
+                                with_pooled_connection, pool, query_time_series,
+                                part_id,
+                                data_json.get('characteristic'),
+                                start=data_json.get('start'),
+                                end=data_json.get('end'),
+                                max_points=max_points,
+                                source=source
+                            )
+                            query_cache.put(cache_key, series, cache_tags, cache_token)
+                        response = {"status": "TimeSeries", "series": series}
+                    except (ValueError, ConnectionError, PoolTimeoutError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                    except Exception as e:
+                        logging.error(f"QueryTimeSeries failed: {e}")
+                        response = {"status": "Error", "message": "Query failed"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'QuerySummary':
+                if pool:
+                    part_id = data_json.get('part_id')
+                    material_id = data_json.get('material_id')
+                    cache_key = ('QuerySummary', part_id, material_id)
+                    cache_tags = ingest_tags(material_id=material_id, part_id=part_id)
+                    summary, cache_token = query_cache.get(cache_key, cache_tags)
+                    try:
+                        if summary is MISSING:
+                            summary = await run_blocking(with_pooled_connection, pool, query_summary,
+                                                         part_id=part_id, material_id=material_id)
+                            query_cache.put(cache_key, summary, cache_tags, cache_token)
+                        response = {"status": "Summary", "summary": summary}
+                    except (ValueError, ConnectionError, PoolTimeoutError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                    except Exception as e:
+                        logging.error(f"QuerySummary failed: {e}")
+                        response = {"status": "Error", "message": "Query failed"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'QueryDscFeatures':
+                if pool:
+                    try:
+                        material_ids = tuple(sorted(set(data_json.get('material_ids') or ())))
+                        cache_key = ('QueryDscFeatures', material_ids)
+                        cache_tags = material_tags(material_ids)
+                        features, cache_token = query_cache.get(cache_key, cache_tags)
+                        if features is MISSING:
+                            features = await run_blocking(with_pooled_connection, pool, query_dsc_features, material_ids)
+                            query_cache.put(cache_key, features, cache_tags, cache_token)
+                        response = {"status": "DscFeatures", "features": features}
+                    except (ConnectionError, PoolTimeoutError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                    except Exception as e:
+                        logging.error(f"QueryDscFeatures failed: {e}")
+                        response = {"status": "Error", "message": "Query failed"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'ArchivePart':
+                if pool:
+                    part_id = data_json.get('part_id')
+                    try:
+                        if not part_id:
+                            raise ValueError("part_id is required")
+                        samples, compressed = await run_blocking(
+                            with_pooled_transaction, pool, archive_part,
+                            data_json.get('source', 'part_characteristics'), part_id,
+                            keep_rows=bool(data_json.get('keep_rows'))
+                        )
+                        query_cache.invalidate(ingest_tags(part_id=part_id))
+                        response = {"status": "PartArchived", "samples": samples, "compressed_bytes": compressed}
+                    except (ValueError, ConnectionError, PoolTimeoutError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                    except Exception as e:
+                        logging.error(f"ArchivePart failed: {e}")
+                        response = {"status": "Error", "message": "Archiving failed"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'RebuildSummaryStats':
+                if pool:
+                    try:
+                        rows = await run_blocking(with_pooled_transaction, pool, rebuild_summary_stats,
+                                                  data_json.get('source'))
+                        query_cache.clear()  # Every part's summary may have changed
+                        response = {"status": "SummaryStatsRebuilt", "rows": rows}
+                    except (ValueError, ConnectionError, PoolTimeoutError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                    except Exception as e:
+                        logging.error(f"RebuildSummaryStats failed: {e}")
+                        response = {"status": "Error", "message": "Rebuild failed"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'RebuildDscFeatures':
+                if pool:
+                    material_id = data_json.get('material_id')
+                    try:
+                        if not material_id:
+                            raise ValueError("material_id is required")
+                        ramps = await run_blocking(with_pooled_transaction, pool, rebuild_dsc_features, material_id)
+                        query_cache.invalidate(material_change_tags(material_id))
+                        response = {"status": "DscFeaturesRebuilt", "ramps": ramps}
+                    except (ValueError, ConnectionError, PoolTimeoutError) as e:
+                        response = {"status": "Error", "message": str(e)}
+                    except Exception as e:
+                        logging.error(f"RebuildDscFeatures failed: {e}")
+                        response = {"status": "Error", "message": "Rebuild failed"}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
+
+            elif data_json.get('command') == 'ExportData':
+                if pool:
+                    await send_export(writer, pool, data_json)
+                else:
+                    await write_message(writer, {"status": "Error", "message": "No DB connection"})
+
+            elif data_json.get('command') == 'CacheStats':
+                await write_message(writer, {"status": "CacheStats", "cache": query_cache.stats()})
+
+            elif data_json.get('command') == 'Stats':
+                if pool:
+                    response = {"status": "Stats", "stats": collect_stats(pool)}
+                else:
+                    response = {"status": "Error", "message": "No DB connection"}
+                await write_message(writer, response)
 
             elif data_json.get('command') == 'TerminateConnection':
                 logging.info("Received termination signal. Terminating connection.")
                 break
 
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON decoding error: {e}")
+            else:
+                command = 'Unknown'  # Keeps client-supplied names out of the metric keys
+
+            metrics.increment(f"commands.{command}")
+            metrics.observe(f"commands.{command}_seconds", time.perf_counter() - started)
+
+    except ProtocolError as e:
+        logging.error(f"Protocol error: {e}")
+    except ConnectionError as e:
+        logging.info(f"Client connection lost: {e}")
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
     finally:
-        if conn:
-            conn.close()
-        client_socket.close()
+        metrics.adjust_gauge("connections.active", -1)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
         logging.info("Client connection closed.")
 
-def upload_data(client_socket, selected_directories, conn):
-    logging.info("Starting data upload process...")
-    process_files_in_directory(selected_directories, conn)
-    client_socket.sendall(json.dumps({"status": "DataUploaded"}).encode())
-    logging.info("Data upload process completed.")
+async def serve():
+    server = await asyncio.start_server(handle_client, SERVER_HOST, SERVER_PORT, backlog=SERVER_BACKLOG)
+    logging.info("Server is listening for connections...")
+    async with server:
+        await server.serve_forever()
 
 # Main server function
 def main():
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.bind(('localhost', 5555))
-    server_socket.listen(5)
-    logging.info("Server is listening for connections...")
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        try:
-            while True:
-                client_socket, _ = server_socket.accept()
-                logging.info("Client connection established.")
-                executor.submit(handle_client, client_socket)
-        except KeyboardInterrupt:
-            logging.info("Server shutting down...")
-    server_socket.close()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logging.info("Server shutting down...")
+    finally:
+        job_manager.shutdown()
+        stop_all_live_ingest()
+        stop_watch()
+        db_executor.shutdown(wait=False, cancel_futures=True)
+        close_all_pools()
 
 if __name__ == "__main__":
     main()
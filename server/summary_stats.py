@@ -0,0 +1,130 @@
+import numpy as np
+
+# Sample tables whose loaders keep summary statistics
+SUMMARY_SOURCES = ("part_characteristics", "benchtop_filament_diameter", "live_print_data")
+
+# Folds a block's statistics into the stored row of the same file; Chan et al.'s pairwise update, evaluated
+# against the old row because every SET expression of ON CONFLICT DO UPDATE sees the values before the update
+UPSERT_SUMMARY_SQL = (
+    "INSERT INTO filamentquality.sample_summary_stats AS s (part_id, source_table, characteristic_id, "
+    "sample_count, min_value, max_value, mean_value, m2, source_file_id) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULLIF(current_setting('filamentquality.source_file_id', true), '')::INTEGER) "
+    "ON CONFLICT (part_id, source_table, characteristic_id, source_file_id) DO UPDATE SET "
+    "sample_count = s.sample_count + EXCLUDED.sample_count, "
+    "min_value = LEAST(s.min_value, EXCLUDED.min_value), "
+    "max_value = GREATEST(s.max_value, EXCLUDED.max_value), "
+    "mean_value = s.mean_value + (EXCLUDED.mean_value - s.mean_value) * EXCLUDED.sample_count "
+    "/ (s.sample_count + EXCLUDED.sample_count)::DOUBLE PRECISION, "
+    "m2 = s.m2 + EXCLUDED.m2 + (EXCLUDED.mean_value - s.mean_value) ^ 2 * s.sample_count::DOUBLE PRECISION "
+    "* EXCLUDED.sample_count / (s.sample_count + EXCLUDED.sample_count)"
+)
+
+
+def merge_moments(a, b):
+    """
+    Combines two (count, min, max, mean, m2) tuples, m2 being the sum of squared deviations from the mean,
+    into the statistics of both sample sets together (Chan, Golub and LeVeque's parallel Welford update).
+    """
+    count_a, min_a, max_a, mean_a, m2_a = a
+    count_b, min_b, max_b, mean_b, m2_b = b
+    if not count_a:
+        return b
+    if not count_b:
+        return a
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    return (count, min(min_a, min_b), max(max_a, max_b), mean_a + delta * count_b / count,
+            m2_a + m2_b + delta * delta * count_a * count_b / count)
+
+
+class SummaryStats:
+    """
+    Running count, min, max, mean and M2 per characteristic of the samples a loader writes, gathered one block at a
+    time with NumPy. Because the statistics merge exactly, write() can fold them into the stored row of the file
+    being loaded: a live file appended to in many batches ends up with the same row as a single load, and a
+    replaced file's rows go with its manifest entry like its samples.
+    """
+    def __init__(self):
+        self.moments = {}  # characteristic_id -> (count, min, max, mean, m2)
+
+    def update(self, characteristic_ids, values):
+        """Adds a block of long samples: parallel arrays of characteristic IDs and values."""
+        if len(values) == 0:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        keys, inverse = np.unique(characteristic_ids, return_inverse=True)
+        counts = np.bincount(inverse)
+        means = np.bincount(inverse, weights=values) / counts
+        m2s = np.bincount(inverse, weights=(values - means[inverse]) ** 2)
+        mins = np.full(len(keys), np.inf)
+        maxs = np.full(len(keys), -np.inf)
+        np.minimum.at(mins, inverse, values)
+        np.maximum.at(maxs, inverse, values)
+        for i, key in enumerate(keys.tolist()):
+            block = (int(counts[i]), float(mins[i]), float(maxs[i]), float(means[i]), float(m2s[i]))
+            self.moments[key] = merge_moments(self.moments.get(key, (0, 0.0, 0.0, 0.0, 0.0)), block)
+
+    def write(self, conn, source, part_id):
+        """
+        Merges the statistics into sample_summary_stats under the transaction's source_file_id and clears them.
+        Does not commit.
+        """
+        if source not in SUMMARY_SOURCES:
+            raise ValueError(f"Unknown summary source: {source}")
+        rows = [(part_id, source, characteristic_id) + moments for characteristic_id, moments in self.moments.items()]
+        if rows:
+            with conn.cursor() as cursor:
+                cursor.executemany(UPSERT_SUMMARY_SQL, rows)
+        self.moments = {}
+        return len(rows)
+
+
+def query_summary(conn, part_id=None, material_id=None):
+    """
+    Reads the quality overview of one part, or of all parts of a material, from the summary views.
+    Returns {source table: {characteristic name: statistics}}.
+    """
+    if part_id:
+        view, key_column, key = "part_summary_stats", "part_id", part_id
+    elif material_id:
+        view, key_column, key = "material_summary_stats", "material_id", material_id
+    else:
+        raise ValueError("part_id or material_id is required")
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT source_table, characteristic_name, sample_count, min_value, max_value, mean_value, stddev_value "
+            f"FROM filamentquality.{view} WHERE {key_column} = %s ORDER BY source_table, characteristic_name",
+            (key,)
+        )
+        rows = cursor.fetchall()
+    summary = {}
+    for source, name, count, minimum, maximum, mean, stddev in rows:
+        summary.setdefault(source, {})[name] = {
+            "count": int(count), "min": minimum, "max": maximum, "mean": mean, "stddev": stddev,
+        }
+    return summary
+
+def rebuild_summary_stats(conn, source):
+    """
+    Recomputes the statistics of one sample table from its rows, for data loaded before loaders kept them.
+    Only files that still have rows in the table are recomputed; the statistics of files whose samples are held
+    only in the compressed archive are kept as they were. Does not commit. Returns the rows written.
+    """
+    if source not in SUMMARY_SOURCES:
+        raise ValueError(f"Unknown summary source: {source}")
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM filamentquality.sample_summary_stats WHERE source_table = %s "
+            f"AND (part_id, source_file_id) IN (SELECT DISTINCT part_id, source_file_id FROM filamentquality.{source})",
+            (source,)
+        )
+        cursor.execute(
+            "INSERT INTO filamentquality.sample_summary_stats (part_id, source_table, characteristic_id, sample_count, "
+            "min_value, max_value, mean_value, m2, source_file_id) "
+            "SELECT part_id, %s, characteristic_id, COUNT(*), MIN(characteristic_value), MAX(characteristic_value), "
+            "AVG(characteristic_value), VAR_POP(characteristic_value) * COUNT(*), source_file_id "
+            f"FROM filamentquality.{source} WHERE source_file_id IS NOT NULL "
+            "GROUP BY part_id, characteristic_id, source_file_id",
+            (source,)
+        )
+        return cursor.rowcount
@@ -0,0 +1,306 @@
+import mmap
+import struct
+import numpy as np
+
+TDMS_MAGIC = b'TDSm'
+# Bytes of the lead-in that starts every segment: tag, ToC mask, version, next segment offset, raw data offset
+LEAD_IN_SIZE = 28
+
+# Table of contents flags of a segment's lead-in
+TOC_META_DATA = 1 << 1
+TOC_NEW_OBJECT_LIST = 1 << 2
+TOC_RAW_DATA = 1 << 3
+TOC_INTERLEAVED_DATA = 1 << 5
+TOC_BIG_ENDIAN = 1 << 6
+TOC_DAQMX_RAW_DATA = 1 << 7
+
+# Raw data index markers
+NO_RAW_DATA = 0xFFFFFFFF
+SAME_RAW_DATA_INDEX = 0x00000000
+DAQMX_INDEXES = (0x00001269, 0x00001369)
+INCOMPLETE_SEGMENT = 0xFFFFFFFFFFFFFFFF
+
+TDS_TYPE_STRING = 0x20
+TDS_TYPE_TIMESTAMP = 0x44
+# NumPy dtypes of the fixed-size TDMS data types, without byte order
+TDS_DTYPES = {
+    0x01: 'i1', 0x02: 'i2', 0x03: 'i4', 0x04: 'i8',
+    0x05: 'u1', 0x06: 'u2', 0x07: 'u4', 0x08: 'u8',
+    0x09: 'f4', 0x0A: 'f8', 0x19: 'f4', 0x1A: 'f8',
+    0x21: 'b1',
+    0x08000C: 'c8', 0x10000D: 'c16',
+}
+# Property values of these types are read with struct, the timestamp as (fraction of 2**-64 s, seconds since 1904)
+TDS_STRUCT_FORMATS = {
+    0x01: 'b', 0x02: 'h', 0x03: 'i', 0x04: 'q',
+    0x05: 'B', 0x06: 'H', 0x07: 'I', 0x08: 'Q',
+    0x09: 'f', 0x0A: 'd', 0x19: 'f', 0x1A: 'd',
+    0x21: '?', TDS_TYPE_TIMESTAMP: 'Qq',
+}
+TDS_EXTENDED_FLOAT = 0x0B
+
+
+class TdmsChannel:
+    """
+    One channel of a TDMS file. Its values are not read when the file is opened; the reader only records
+    where each run of values sits in the file, and read() maps the requested range as NumPy views of the file.
+    """
+    def __init__(self, path, group, name):
+        self.path = path
+        self.group = group
+        self.name = name
+        self.properties = {}
+        self.data_type = None
+        self.index = None  # (data type, values per chunk, bytes per chunk) of the segment being parsed
+        self._pieces = []  # (byte offset, number of values, stride in bytes)
+        self._piece_starts = None  # Index of the first value of each piece, built on the first read
+        self._buffer = None
+        self._dtype = None
+
+    def __len__(self):
+        return sum(count for _, count, _ in self._pieces)
+
+    def _add_piece(self, offset, count, stride):
+        self._piece_starts = None
+        if self._pieces:
+            last_offset, last_count, last_stride = self._pieces[-1]
+            if stride == last_stride == self._dtype.itemsize and last_offset + last_count * stride == offset:
+                self._pieces[-1] = (last_offset, last_count + count, stride)
+                return
+        self._pieces.append((offset, count, stride))
+
+    def read(self, start=0, stop=None):
+        """
+        Returns the values from index start up to stop (the end of the channel by default). A range within one
+        contiguous or interleaved run is returned as a view of the memory-mapped file without copying; a range
+        spanning several segments is concatenated, so only that range is copied. Reading a long segmented
+        channel block by block therefore keeps memory bounded by the block size.
+        """
+        if self._dtype is None:
+            if self.data_type is None:
+                return np.empty(0, dtype=np.float64)
+            raise ValueError(f"TDMS channel {self.path} has unsupported data type 0x{self.data_type:X}")
+        if self._piece_starts is None:
+            self._piece_starts = np.cumsum([0] + [count for _, count, _ in self._pieces])
+        start, stop, _ = slice(start, stop).indices(int(self._piece_starts[-1]))
+        if start >= stop:
+            return np.empty(0, dtype=self._dtype)
+        first = int(np.searchsorted(self._piece_starts, start, side='right')) - 1
+        views = []
+        for piece in range(first, len(self._pieces)):
+            piece_start = int(self._piece_starts[piece])
+            if piece_start >= stop:
+                break
+            offset, count, stride = self._pieces[piece]
+            low, high = max(start - piece_start, 0), min(stop - piece_start, count)
+            views.append(np.ndarray(shape=(high - low,), dtype=self._dtype, buffer=self._buffer,
+                                    offset=offset + low * stride, strides=(stride,)))
+        return views[0] if len(views) == 1 else np.concatenate(views)
+
+    def time_track(self, start=0, stop=None):
+        """
+        Elapsed time in seconds of the samples from start up to stop, from the waveform properties
+        (wf_start_offset, wf_increment).
+        """
+        if 'wf_increment' not in self.properties:
+            raise ValueError(f"TDMS channel {self.path} has no time channel or wf_increment property")
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return self.properties.get('wf_start_offset', 0.0) + np.arange(start, stop) * self.properties['wf_increment']
+
+
+class TdmsFile:
+    """
+    Read-only view of a binary TDMS file through a memory map. Opening it walks the segment lead-ins and
+    metadata only, so reading a few channels of a large acquisition touches just the pages holding them.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.properties = {}
+        self.channels = []
+        self._file = open(file_path, 'rb')
+        size = self._file.seek(0, 2)
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            self._read_segments()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Arrays returned by read() still point into the map; it is unmapped when they are freed
+        self._file.close()
+
+    def channel(self, name, group=None):
+        """Returns the first channel called name, optionally only within group, or None."""
+        for channel in self.channels:
+            if channel.name == name and (group is None or channel.group == group):
+                return channel
+        return None
+
+    def _read_segments(self):
+        buffer = self._mmap
+        size = len(buffer)
+        objects = {}
+        active = []  # Objects with raw data in the current segment, in the order their values are stored
+        offset = 0
+        while offset + LEAD_IN_SIZE <= size:
+            if buffer[offset:offset + 4] != TDMS_MAGIC:
+                raise ValueError(f"Invalid TDMS segment at byte {offset} of {self.file_path}")
+            toc, _, next_offset, raw_offset = struct.unpack_from('<IIQQ', buffer, offset + 4)
+            endian = '>' if toc & TOC_BIG_ENDIAN else '<'
+            metadata_start = offset + LEAD_IN_SIZE
+            segment_end = size if next_offset == INCOMPLETE_SEGMENT else min(metadata_start + next_offset, size)
+
+            if toc & TOC_DAQMX_RAW_DATA:
+                raise ValueError(f"DAQmx raw data in {self.file_path} is not supported")
+            if toc & TOC_META_DATA:
+                if toc & TOC_NEW_OBJECT_LIST:
+                    active = []
+                self._read_metadata(buffer, metadata_start, endian, objects, active)
+            if toc & TOC_RAW_DATA:
+                self._map_raw_data(metadata_start + raw_offset, segment_end, active, bool(toc & TOC_INTERLEAVED_DATA))
+            offset = segment_end
+
+    def _read_metadata(self, buffer, position, endian, objects, active):
+        (object_count,), position = struct.unpack_from(endian + 'I', buffer, position), position + 4
+        for _ in range(object_count):
+            path, position = _read_string(buffer, position, endian)
+            (index_length,), position = struct.unpack_from(endian + 'I', buffer, position), position + 4
+            obj = objects.get(path)
+            if obj is None:
+                obj = objects[path] = self._new_object(path)
+
+            if index_length == NO_RAW_DATA:
+                index = None
+            elif index_length == SAME_RAW_DATA_INDEX:
+                index = obj.index if isinstance(obj, TdmsChannel) else None
+            elif index_length in DAQMX_INDEXES:
+                raise ValueError(f"DAQmx raw data in {self.file_path} is not supported")
+            else:
+                data_type, _, count = struct.unpack_from(endian + 'IIQ', buffer, position)
+                position += 16
+                if data_type == TDS_TYPE_STRING:
+                    (chunk_bytes,), position = struct.unpack_from(endian + 'Q', buffer, position), position + 8
+                else:
+                    chunk_bytes = count * _itemsize(data_type)
+                index = (data_type, count, chunk_bytes)
+
+            (property_count,), position = struct.unpack_from(endian + 'I', buffer, position), position + 4
+            for _ in range(property_count):
+                name, position = _read_string(buffer, position, endian)
+                (property_type,), position = struct.unpack_from(endian + 'I', buffer, position), position + 4
+                obj.properties[name], position = _read_value(buffer, position, endian, property_type)
+
+            if isinstance(obj, TdmsChannel):
+                obj.index = index
+                if index is not None and obj.data_type is None:
+                    obj.data_type = index[0]
+                    if index[0] in TDS_DTYPES:
+                        obj._dtype = np.dtype(endian + TDS_DTYPES[index[0]])
+                        obj._buffer = buffer
+                if obj in active:
+                    if index is None:
+                        active.remove(obj)
+                elif index is not None:
+                    active.append(obj)
+
+    def _new_object(self, path):
+        parts = _split_path(path)
+        if len(parts) == 0:
+            return _TdmsObject(self.properties)
+        if len(parts) == 1:
+            return _TdmsObject({})
+        channel = TdmsChannel(path, parts[0], parts[1])
+        self.channels.append(channel)
+        return channel
+
+    @staticmethod
+    def _map_raw_data(start, end, active, interleaved):
+        channels = [channel for channel in active if channel.index and channel.index[1]]
+        chunk_bytes = sum(channel.index[2] for channel in channels)
+        if not chunk_bytes:
+            return
+        # A final chunk cut short by an interrupted acquisition is ignored
+        chunk_count = (end - start) // chunk_bytes
+        if interleaved:
+            row_bytes = sum(_itemsize(channel.index[0]) for channel in channels)
+            count = channels[0].index[1]
+            for chunk in range(chunk_count):
+                column_offset = start + chunk * chunk_bytes
+                for channel in channels:
+                    if channel._dtype is not None:
+                        channel._add_piece(column_offset, count, row_bytes)
+                    column_offset += _itemsize(channel.index[0])
+            return
+        position = start
+        for _ in range(chunk_count):
+            for channel in channels:
+                if channel._dtype is not None:
+                    channel._add_piece(position, channel.index[1], channel._dtype.itemsize)
+                position += channel.index[2]
+
+
+class _TdmsObject:
+    """File or group object, which only carries properties."""
+    def __init__(self, properties):
+        self.properties = properties
+
+
+def _itemsize(data_type):
+    if data_type in TDS_DTYPES:
+        return np.dtype(TDS_DTYPES[data_type]).itemsize
+    if data_type == TDS_TYPE_TIMESTAMP or data_type == TDS_EXTENDED_FLOAT:
+        return 16
+    raise ValueError(f"Unsupported TDMS data type 0x{data_type:X}")
+
+def _read_string(buffer, position, endian):
+    (length,) = struct.unpack_from(endian + 'I', buffer, position)
+    position += 4
+    return bytes(buffer[position:position + length]).decode('utf-8', errors='replace'), position + length
+
+def _read_value(buffer, position, endian, data_type):
+    if data_type == TDS_TYPE_STRING:
+        return _read_string(buffer, position, endian)
+    if data_type == TDS_TYPE_TIMESTAMP:
+        fraction, seconds = struct.unpack_from(endian + 'Qq', buffer, position)
+        return seconds + fraction / 2 ** 64, position + 16  # Seconds since 1904-01-01 UTC
+    if data_type in TDS_STRUCT_FORMATS:
+        fmt = endian + TDS_STRUCT_FORMATS[data_type]
+        return struct.unpack_from(fmt, buffer, position)[0], position + struct.calcsize(fmt)
+    return None, position + _itemsize(data_type)
+
+def _split_path(path):
+    """Splits an object path such as /'Group'/'Channel' into its names, undoubling escaped quotes."""
+    names = []
+    position = 0
+    while position < len(path):
+        if path[position] != '/' or path[position + 1:position + 2] != "'":
+            break
+        position += 2
+        name = []
+        while position < len(path):
+            if path[position] == "'":
+                if path[position + 1:position + 2] == "'":
+                    name.append("'")
+                    position += 2
+                    continue
+                position += 1
+                break
+            name.append(path[position])
+            position += 1
+        names.append(''.join(name))
+    return names
+
+def is_tdms_file(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read(4) == TDMS_MAGIC
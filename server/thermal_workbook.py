@@ -0,0 +1,107 @@
+import os
+import re
+from array import array
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Sheets of one .xlsx workbook parsed at the same time
+THERMAL_SHEET_WORKERS = 4
+# Combined header names of the columns loaded from every ramp sheet
+THERMAL_COLUMNS = ('Time min', 'Temperature °C', 'Heat Flow W/g')
+
+
+class ThermalSheet:
+    """
+    One DSC/TGA ramp sheet as columnar float64 arrays, ready for bulk insert.
+    """
+    def __init__(self, name, dsc_ramp, time_min, temperature, heat_flow, skipped_rows):
+        self.name = name
+        self.dsc_ramp = dsc_ramp
+        self.time_min = time_min
+        self.temperature = temperature
+        self.heat_flow = heat_flow
+        self.skipped_rows = skipped_rows
+
+    def __len__(self):
+        return len(self.time_min)
+
+
+def combine_headers(name_row, unit_row):
+    """
+    Joins the column name and unit header rows and strips parenthesised notes, e.g. 'Heat Flow' + 'W/g' -> 'Heat Flow W/g'.
+    """
+    return [
+        re.sub(r'\s*\([^)]*\)', '', f"{'' if name is None else name} {'' if unit is None else unit}").strip()
+        for name, unit in zip_longest(name_row, unit_row)
+    ]
+
+
+def parse_sheet_rows(sheet_name, rows):
+    """
+    Parses a ramp sheet from an iterator of row tuples: the ramp name, the column names, the units, then data.
+    Rows without a numeric time, temperature and heat flow (blank padding, notes) are skipped.
+    """
+    rows = iter(rows)
+    ramp_row = next(rows, ()) or ()
+    name_row = next(rows, ()) or ()
+    unit_row = next(rows, ()) or ()
+    dsc_ramp = ramp_row[0] if ramp_row and ramp_row[0] not in (None, '') else "Unknown Ramp"
+
+    headers = combine_headers(name_row, unit_row)
+    try:
+        indexes = [headers.index(column) for column in THERMAL_COLUMNS]
+    except ValueError:
+        raise ValueError(f"Sheet '{sheet_name}' is missing one of the columns {', '.join(THERMAL_COLUMNS)}")
+
+    columns = [array('d') for _ in THERMAL_COLUMNS]
+    skipped_rows = 0
+    for row in rows:
+        try:
+            values = [float(row[index]) for index in indexes]
+        except (IndexError, TypeError, ValueError):
+            skipped_rows += 1
+            continue
+        for column, value in zip(columns, values):
+            column.append(value)
+
+    time_min, temperature, heat_flow = (np.frombuffer(column, dtype=np.float64) for column in columns)
+    return ThermalSheet(sheet_name, str(dsc_ramp), time_min, temperature, heat_flow, skipped_rows)
+
+
+def read_thermal_workbook(file_path, skip_sheets=1, workers=THERMAL_SHEET_WORKERS):
+    """
+    Yields a ThermalSheet per ramp sheet, in workbook order, opening the file only once.
+    The first skip_sheets sheets (the summary) are ignored. .xlsx workbooks are streamed in read-only
+    mode and their sheets are parsed on a thread pool, so later sheets are parsed while earlier ones
+    are being written. Legacy .xls workbooks are read sheet by sheet on demand.
+    """
+    if os.path.splitext(file_path)[1].lower() == '.xls':
+        import xlrd
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            for sheet_name in workbook.sheet_names()[skip_sheets:]:
+                sheet = workbook.sheet_by_name(sheet_name)
+                yield parse_sheet_rows(sheet_name, (sheet.row_values(i) for i in range(sheet.nrows)))
+                workbook.unload_sheet(sheet_name)
+        finally:
+            workbook.release_resources()
+        return
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheets = [workbook[name] for name in workbook.sheetnames[skip_sheets:]]
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(worksheets)))) as executor:
+            futures = [
+                executor.submit(parse_sheet_rows, worksheet.title, worksheet.iter_rows(values_only=True))
+                for worksheet in worksheets
+            ]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:  # Stop parsing sheets nobody will write
+                    future.cancel()
+    finally:
+        workbook.close()
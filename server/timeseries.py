@@ -0,0 +1,140 @@
+import numpy as np
+from series_archive import read_series, archived_source_files
+
+# Tables a series can be read from, with the column that orders their samples
+SERIES_SOURCES = {
+    "part_characteristics": ("filamentquality.part_characteristics", "time_elapsed"),
+    "live_print_data": ("filamentquality.live_print_data", "time_stamp"),
+    "benchtop_filament_diameter": ("filamentquality.benchtop_filament_diameter", "position"),
+}
+DEFAULT_POINT_BUDGET = 2000
+MAX_POINT_BUDGET = 20000
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+    Keeps the first and last points and, from each bucket in between, the point forming the largest
+    triangle with the previously kept point and the average of the next bucket, which preserves peaks and shape.
+    Returns the indices of the kept points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        next_start = range_end
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        candidate_x = x[range_start:range_end]
+        candidate_y = y[range_start:range_end]
+        areas = np.abs((x[a] - avg_x) * (candidate_y - y[a]) - (x[a] - candidate_x) * (avg_y - y[a]))
+        a = range_start + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def find_characteristic_id(conn, characteristic):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT characteristic_id FROM filamentquality.characteristics WHERE characteristic_name = %s",
+            (characteristic,)
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def query_time_series(conn, part_id, characteristic, start=None, end=None, max_points=DEFAULT_POINT_BUDGET,
+                      source="part_characteristics"):
+    """
+    Reads one part's series for a characteristic, reduced on the server to at most max_points points.
+    Long series are first cut to the first, last, minimum and maximum sample of max_points equal-width
+    buckets in SQL (M4), so only a few thousand rows leave the database, then reduced with LTTB.
+    Source files kept in the compressed archive tier are read from their chunks instead, merged with the rows of
+    the series' other files and reduced with LTTB.
+    """
+    if source not in SERIES_SOURCES:
+        raise ValueError(f"Unknown series source: {source}")
+    max_points = max(3, min(int(max_points), MAX_POINT_BUDGET))
+    table, time_column = SERIES_SOURCES[source]
+    series = {"part_id": part_id, "characteristic": characteristic, "source": source,
+              "total_points": 0, "x": [], "y": []}
+
+    characteristic_id = find_characteristic_id(conn, characteristic)
+    if characteristic_id is None:
+        return series
+
+    # Files with archived chunks are read from them; rows of the other files of the series from the table
+    archived_files = archived_source_files(conn, source, part_id, characteristic_id)
+    archived_x = archived_y = np.empty(0)
+    if archived_files:
+        archived_x, archived_y = read_series(conn, source, part_id, characteristic_id, start, end) or (archived_x, archived_y)
+
+    params = {
+        "part_id": part_id,
+        "characteristic_id": characteristic_id,
+        "start": float("-inf") if start is None else float(start),
+        "end": float("inf") if end is None else float(end),
+        # source_file_id is a serial, so -1 stands in for rows and chunks without one
+        "archived_files": [-1 if source_file_id is None else source_file_id for source_file_id in archived_files],
+    }
+    row_filter = "AND COALESCE(source_file_id, -1) <> ALL(%(archived_files)s)" if archived_files else ""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*), min({time_column}), max({time_column}) FROM {table} "
+            f"WHERE part_id = %(part_id)s AND characteristic_id = %(characteristic_id)s "
+            f"AND {time_column} BETWEEN %(start)s AND %(end)s {row_filter}",
+            params
+        )
+        row_points, first_time, last_time = cursor.fetchone()
+        if row_points and (row_points <= max_points or first_time == last_time):
+            cursor.execute(
+                f"SELECT {time_column}, characteristic_value FROM {table} "
+                f"WHERE part_id = %(part_id)s AND characteristic_id = %(characteristic_id)s "
+                f"AND {time_column} BETWEEN %(start)s AND %(end)s {row_filter} ORDER BY {time_column} LIMIT %(limit)s",
+                dict(params, limit=max_points)
+            )
+        elif row_points:
+            cursor.execute(
+                f"""
+                SELECT t, v FROM (
+                    SELECT t, v,
+                        row_number() OVER (PARTITION BY b ORDER BY t) AS first_rank,
+                        row_number() OVER (PARTITION BY b ORDER BY t DESC) AS last_rank,
+                        row_number() OVER (PARTITION BY b ORDER BY v, t) AS min_rank,
+                        row_number() OVER (PARTITION BY b ORDER BY v DESC, t) AS max_rank
+                    FROM (
+                        SELECT {time_column} AS t, characteristic_value AS v,
+                            width_bucket({time_column}, %(first_time)s, %(last_time)s, %(buckets)s) AS b
+                        FROM {table}
+                        WHERE part_id = %(part_id)s AND characteristic_id = %(characteristic_id)s
+                          AND {time_column} BETWEEN %(start)s AND %(end)s {row_filter}
+                    ) samples
+                ) ranked
+                WHERE first_rank = 1 OR last_rank = 1 OR min_rank = 1 OR max_rank = 1
+                ORDER BY t
+                """,
+                dict(params, first_time=first_time, last_time=last_time, buckets=max_points)
+            )
+        rows = cursor.fetchall() if row_points else []
+
+    series["total_points"] = len(archived_x) + row_points
+    x = np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+    y = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    if len(archived_x):
+        x, y = np.concatenate([archived_x, x]), np.concatenate([archived_y, y])
+        if len(rows):
+            order = np.argsort(x, kind='stable')
+            x, y = x[order], y[order]
+    keep = lttb(x, y, max_points)
+    series["x"] = x[keep].tolist()
+    series["y"] = y[keep].tolist()
+    return series
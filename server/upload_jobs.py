@@ -0,0 +1,214 @@
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from database_operations import collect_ingest_tasks, ingest_tasks, INGEST_WORKERS
+from connection_pool import PoolTimeoutError
+from query_cache import invalidate_for_ingest_result
+from metrics import metrics, INGEST_STAGES
+
+# Upload jobs allowed to run at the same time; further jobs wait in the queue
+MAX_CONCURRENT_JOBS = 2
+# Finished jobs kept for status queries before the oldest are forgotten
+MAX_FINISHED_JOBS = 100
+# Per-file error messages kept on each job
+MAX_JOB_ERRORS = 50
+
+
+class UploadJob:
+    """
+    Progress and outcome of one DataUpload request, updated from the thread that runs it.
+    A job loads every file of its selected directories, or just the (filepath, purpose) tasks it was given.
+    It belongs to the connection pool of the credentials that submitted it.
+    """
+    def __init__(self, selected_directories, tasks=None, owner=None):
+        self.job_id = uuid.uuid4().hex
+        self.owner = owner
+        self.selected_directories = selected_directories
+        self.tasks = tasks
+        self.status = "Queued"
+        self.files_total = 0
+        self.files_done = 0
+        self.files_failed = 0
+        self.files_skipped = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.bytes_read = 0
+        self.stage_seconds = dict.fromkeys(INGEST_STAGES, 0.0)
+        self.peak_rss_bytes = None  # Highest resident memory of a process while it loaded one of this job's files
+        self.errors = []
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, files_total):
+        with self._lock:
+            self.status = "Running"
+            self.files_total = files_total
+            self.started_at = time.time()
+
+    def record(self, result):
+        with self._lock:
+            self.files_done += 1
+            timings = result.get("timings")
+            if timings:
+                self.bytes_read += timings["bytes_read"]
+                for stage, seconds in timings["stages"].items():
+                    self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+                if timings["peak_rss_bytes"] is not None:
+                    self.peak_rss_bytes = max(self.peak_rss_bytes or 0, timings["peak_rss_bytes"])
+            if result["status"] == "Success":
+                self.rows_written += result.get("rows", 0)
+                self.rows_rejected += result.get("rows_rejected", 0)
+            elif result["status"] == "Skipped":
+                self.files_skipped += 1
+            else:
+                self.files_failed += 1
+                if len(self.errors) < MAX_JOB_ERRORS:
+                    self.errors.append({"file": result["file"], "error": result.get("error", "")})
+
+    def finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.finished_at = time.time()
+            if error:
+                self.errors.append({"file": None, "error": error})
+        metrics.increment(f"upload.jobs.{status.lower()}")
+        if self.started_at:
+            metrics.observe("upload.job_seconds", self.finished_at - self.started_at)
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = 0.0
+            if self.started_at:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "files_total": self.files_total,
+                "files_done": self.files_done,
+                "files_failed": self.files_failed,
+                "files_skipped": self.files_skipped,
+                "rows_written": self.rows_written,
+                "rows_rejected": self.rows_rejected,
+                "rows_per_second": round(self.rows_written / elapsed, 1) if elapsed > 0 else 0.0,
+                "bytes_read": self.bytes_read,
+                "mb_per_second": round(self.bytes_read / elapsed / 1e6, 2) if elapsed > 0 else 0.0,
+                "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()},
+                "peak_rss_mb": round(self.peak_rss_bytes / 1e6, 1) if self.peak_rss_bytes else None,
+                "elapsed_seconds": round(elapsed, 3),
+                "errors": list(self.errors),
+                "submitted_at": self.submitted_at,
+            }
+
+
+class JobManager:
+    """
+    Runs upload jobs in the background, at most max_concurrent_jobs at a time.
+    """
+    def __init__(self, max_concurrent_jobs=MAX_CONCURRENT_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix='upload-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, pool, selected_directories, password, tasks=None):
+        job = UploadJob(selected_directories, tasks, owner=pool)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._forget_finished_locked()
+        self._executor.submit(self._run, job, pool, password)
+        logging.info(f"Upload job {job.job_id} queued.")
+        return job
+
+    def get(self, job_id, owner=None):
+        """Returns the job, or None if it is unknown or, when owner is given, was submitted by other credentials."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner is not owner):
+            return None
+        return job
+
+    def list_jobs(self, owner=None):
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if owner is None or job.owner is owner]
+        return [job.snapshot() for job in jobs]
+
+    def cancel(self, job_id, owner=None):
+        job = self.get(job_id, owner)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        logging.info(f"Cancellation requested for upload job {job_id}.")
+        return job
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, pool, password):
+        if job.cancel_event.is_set():
+            job.finish("Cancelled")
+            return
+        try:
+            tasks = job.tasks if job.tasks is not None else collect_ingest_tasks(job.selected_directories)
+            job.start(len(tasks))
+            if not self._ingest(job, pool, password, tasks):
+                job.finish("Failed", "No DB connection")
+                return
+        except PoolTimeoutError as e:
+            logging.error(f"Upload job {job.job_id} could not get a database connection: {e}")
+            job.finish("Failed", "Database busy")
+            return
+        except Exception as e:
+            logging.error(f"Upload job {job.job_id} failed: {e}")
+            job.finish("Failed", str(e))
+            return
+        job.finish("Cancelled" if job.cancel_event.is_set() else "Completed")
+        logging.info(f"Upload job {job.job_id} {job.status.lower()}: {job.files_done - job.files_failed - job.files_skipped} loaded, "
+                     f"{job.files_skipped} unchanged, {job.files_failed} failed, {job.rows_written} rows, "
+                     f"{job.rows_rejected} rejected.")
+
+    def _ingest(self, job, pool, password, tasks):
+        """
+        Loads the tasks on worker processes whose connections are reserved in the credentials' pool, so parallel
+        jobs stay within its max_connections and leave its headroom to other sessions, or one by one on a pooled
+        connection when fewer than two slots can be reserved.
+        Returns False if no database connection could be opened.
+        """
+        on_file_done = self._file_done(job)
+        workers = min(INGEST_WORKERS, len(tasks))
+        if workers > 1:
+            with pool.reserve(workers) as reserved:
+                if reserved > 1:
+                    ingest_tasks(tasks, None, password=password, workers=reserved, on_file_done=on_file_done,
+                                 cancel_event=job.cancel_event)
+                    return True
+        with pool.connection() as conn:
+            if not conn:
+                return False
+            ingest_tasks(tasks, conn, on_file_done=on_file_done, cancel_event=job.cancel_event)
+        return True
+
+    @staticmethod
+    def _file_done(job):
+        def on_file_done(result):
+            job.record(result)
+            metrics.record_ingest_result(result)
+            invalidate_for_ingest_result(result)
+        return on_file_done
+
+    def _forget_finished_locked(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -0,0 +1,91 @@
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server'))
+from dsc_features import extract_ramp_features
+
+# Samples per synthetic ramp, over 20 minutes at 10 °C/min like the benchmark workbooks
+RAMP_POINTS = 5000
+# Standard deviation of the noise added to the synthetic heat flow, in W/g
+NOISE = 0.002
+
+
+def ramp(heating=True):
+    time_min = np.arange(RAMP_POINTS) * (20 / RAMP_POINTS)
+    temperature = 25 + 10 * time_min if heating else 225 - 10 * time_min
+    return time_min, temperature
+
+def peak(temperature, center, height, width=4.0):
+    """Gaussian peak exp(-((T - center) / width)²); its area at 10 °C/min is height·width·√π / 10 W/g·min."""
+    return height * np.exp(-((temperature - center) / width) ** 2)
+
+def step(temperature, center, height, width=1.5):
+    return height / (1 + np.exp(-(temperature - center) / width))
+
+def enthalpy(height, width=4.0):
+    return abs(height) * width * np.sqrt(np.pi) / 10 * 60
+
+def onset(center, width=4.0, heating=True):
+    """Where the steepest tangent of the leading edge of a Gaussian peak meets its baseline."""
+    return center - np.sqrt(2) * width if heating else center + np.sqrt(2) * width
+
+
+class ExtractRampFeaturesTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def noise(self):
+        return self.rng.normal(0, NOISE, RAMP_POINTS)
+
+    def test_single_peak_has_no_glass_transition(self):
+        time_min, temperature = ramp()
+        features = extract_ramp_features(time_min, temperature, -0.2 + peak(temperature, 160, 1.0) + self.noise())
+        self.assertEqual(features.peak_type, 'exothermic')
+        self.assertAlmostEqual(features.peak_temperature, 160, delta=0.5)
+        self.assertAlmostEqual(features.onset_temperature, onset(160), delta=0.5)
+        self.assertAlmostEqual(features.enthalpy, enthalpy(1.0), delta=0.02 * enthalpy(1.0))
+        self.assertIsNone(features.glass_transition_temperature)
+
+    def test_glass_transition_step_is_not_a_peak(self):
+        time_min, temperature = ramp()
+        features = extract_ramp_features(time_min, temperature, -0.2 + step(temperature, 60, -0.05) + self.noise())
+        self.assertIsNone(features.peak_type)
+        self.assertIsNone(features.enthalpy)
+        self.assertAlmostEqual(features.glass_transition_temperature, 60, delta=2)
+
+    def test_semicrystalline_curve(self):
+        # PLA-like heating: glass transition, cold crystallisation, then a larger melting peak on a drifting baseline
+        time_min, temperature = ramp()
+        heat_flow = (-0.2 + 0.0005 * temperature + step(temperature, 60, -0.05) + peak(temperature, 100, 0.3)
+                     + peak(temperature, 170, -0.6) + self.noise())
+        features = extract_ramp_features(time_min, temperature, heat_flow)
+        self.assertEqual(features.peak_type, 'endothermic')
+        self.assertAlmostEqual(features.peak_temperature, 170, delta=0.5)
+        self.assertAlmostEqual(features.onset_temperature, onset(170), delta=0.5)
+        self.assertAlmostEqual(features.enthalpy, enthalpy(0.6), delta=0.02 * enthalpy(0.6))
+        self.assertAlmostEqual(features.glass_transition_temperature, 60, delta=2)
+
+    def test_cooling_crystallisation(self):
+        time_min, temperature = ramp(heating=False)
+        features = extract_ramp_features(time_min, temperature, -0.2 + peak(temperature, 160, 1.0) + self.noise())
+        self.assertEqual(features.ramp_direction, 'cooling')
+        self.assertEqual(features.peak_type, 'exothermic')
+        self.assertAlmostEqual(features.onset_temperature, onset(160, heating=False), delta=0.5)
+        self.assertAlmostEqual(features.enthalpy, enthalpy(1.0), delta=0.02 * enthalpy(1.0))
+        self.assertIsNone(features.glass_transition_temperature)
+
+    def test_noise_has_no_features(self):
+        time_min, temperature = ramp()
+        features = extract_ramp_features(time_min, temperature, -0.2 + self.noise())
+        self.assertIsNone(features.peak_type)
+        self.assertIsNone(features.glass_transition_temperature)
+
+    def test_short_ramp_is_skipped(self):
+        time_min, temperature = ramp()
+        self.assertIsNone(extract_ramp_features(time_min[:10], temperature[:10], np.zeros(10)))
+
+
+if __name__ == '__main__':
+    unittest.main()